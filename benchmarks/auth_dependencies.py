@@ -0,0 +1,46 @@
+"""Cost of the `get_current_token` -> `get_current_user` chain for a repeated bearer token.
+
+Run from the project root: `poetry run python -m benchmarks.auth_dependencies`
+"""
+
+import asyncio
+import time
+
+from bson import ObjectId
+
+from benchmarks.environment import use_placeholder_settings
+from src.tokens import dependencies as tokens_dependencies
+from src.tokens import service as tokens_service
+from src.users.dependencies import get_current_user
+from src.users.schemas import User
+
+CALLS = 20_000
+
+
+async def _run_chain(token: str, clear_cache: bool) -> float:
+    started = time.perf_counter()
+
+    for _ in range(CALLS):
+        if clear_cache:
+            tokens_dependencies._verified_tokens.clear()
+        get_current_user(await tokens_dependencies.get_current_token(token))
+
+    return (time.perf_counter() - started) / CALLS
+
+
+async def main():
+    use_placeholder_settings()
+
+    user = User(_id=ObjectId(), email="student@example.com", full_name="Student")
+    token = tokens_service.create_access_token(user)
+
+    uncached = await _run_chain(token, clear_cache=True)
+    cached = await _run_chain(token, clear_cache=False)
+
+    print(f"uncached: {uncached * 1_000_000:8.2f} us/request")
+    print(f"  cached: {cached * 1_000_000:8.2f} us/request ({uncached / cached:.1f}x)")
+    print(f"hit rate: {tokens_dependencies._verified_tokens.hits / CALLS:.3f} (cached run)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
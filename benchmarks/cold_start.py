@@ -0,0 +1,84 @@
+"""Cold-start time of the service: importing the app, then booting workers together.
+
+Importing is measured in fresh interpreters with an empty environment, which also
+checks that no settings are read at import time. With `--workers N` that many
+processes then run the app lifespan at once against the configured MongoDB,
+racing for the startup lock as uvicorn workers would.
+
+Run from the project root: `poetry run python -m benchmarks.cold_start --workers 4`
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import src.main
+print(time.perf_counter() - started)
+"""
+
+BOOT_SNIPPET = """
+import asyncio, json, time
+from src import main
+from src.monitoring import metrics
+
+async def boot():
+    started = time.perf_counter()
+    async with main.app_lifespan(main.app):
+        elapsed = time.perf_counter() - started
+    lifespans = {
+        sample.labels["lifespan"]: sample.value
+        for metric in metrics.startup_duration_seconds.collect()
+        for sample in metric.samples
+    }
+    print(json.dumps({"total": elapsed, "lifespans": lifespans}))
+
+asyncio.run(boot())
+"""
+
+
+def measure_import(runs: int) -> list[float]:
+    clean_env = {"PATH": os.environ.get("PATH", "")}
+    return [
+        float(subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], env=clean_env))
+        for _ in range(runs)
+    ]
+
+
+def measure_boot(workers: int) -> list[dict]:
+    processes = [
+        subprocess.Popen([sys.executable, "-c", BOOT_SNIPPET], stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    return [json.loads(process.communicate()[0].splitlines()[-1]) for process in processes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=0)
+    args = parser.parse_args()
+
+    import_times = measure_import(args.import_runs)
+    print(
+        f"import src.main: median {statistics.median(import_times) * 1000:.0f} ms, "
+        f"max {max(import_times) * 1000:.0f} ms over {args.import_runs} runs"
+    )
+
+    if args.workers:
+        boots = measure_boot(args.workers)
+        for index, boot in enumerate(boots):
+            lifespans = ", ".join(
+                f"{name.removeprefix('src.')} {seconds * 1000:.0f} ms"
+                for name, seconds in boot["lifespans"].items()
+            )
+            print(f"worker {index}: {boot['total'] * 1000:.0f} ms ({lifespans})")
+
+
+if __name__ == "__main__":
+    main()
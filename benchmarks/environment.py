@@ -0,0 +1,21 @@
+"""Placeholder settings for benchmarks that never talk to Mongo or an SMTP server."""
+
+import os
+
+REQUIRED_SETTINGS = (
+    "MONGO_USERNAME",
+    "MONGO_PASSWORD",
+    "JWT_SIGNING_SECRET_KEY",
+    "ROOT_USER_EMAIL",
+    "ROOT_USER_FULL_NAME",
+    "ROOT_USER_PASSWORD",
+    "MAIL_USERNAME",
+    "MAIL_PASSWORD",
+    "MAIL_FROM",
+)
+
+
+def use_placeholder_settings():
+    """Fills the required settings that are not set, real values from the environment win."""
+    for name in REQUIRED_SETTINGS:
+        os.environ.setdefault(name, "benchmark@example.com")
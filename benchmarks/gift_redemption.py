@@ -0,0 +1,81 @@
+"""Concurrent redemption of one gift by one user against a running MongoDB.
+
+Uses the regular `.env` settings. Run from the project root:
+`poetry run python -m benchmarks.gift_redemption`
+"""
+
+import asyncio
+import statistics
+import time
+
+from bson import ObjectId
+
+from src import mongo
+from src.exceptions import DetailedHTTPException
+from src.gifts import service as gifts_service
+from src.gifts.schemas import VerifyReceiptRequest
+
+CONCURRENCY = 50
+PRICE_POINTS = 10
+
+
+async def _timed_redemption(gift_id: ObjectId, receiver_id: ObjectId) -> tuple[float, bool]:
+    started = time.perf_counter()
+    try:
+        await gifts_service.verify_gift_receipt(
+            gift_id, VerifyReceiptRequest(receiver_id=receiver_id)
+        )
+        succeeded = True
+    except DetailedHTTPException:
+        succeeded = False
+
+    return time.perf_counter() - started, succeeded
+
+
+async def main():
+    async with mongo.lifespan(None):
+        receiver_id = ObjectId()
+        gift_id = ObjectId()
+
+        await mongo.users_collection.insert_one(
+            {
+                "_id": receiver_id,
+                "email": f"{receiver_id}@benchmark.local",
+                "full_name": "Benchmark",
+                "role": "user",
+                "points": PRICE_POINTS * 3,
+                "hashed_password": "",
+            }
+        )
+        await mongo.gifts_collection.insert_one(
+            {"_id": gift_id, "name": "Benchmark", "price_points": PRICE_POINTS, "category": "-"}
+        )
+
+        try:
+            results = await asyncio.gather(
+                *(_timed_redemption(gift_id, receiver_id) for _ in range(CONCURRENCY))
+            )
+
+            user_dict = await mongo.users_collection.find_one({"_id": receiver_id})
+            gift_dict = await mongo.gifts_collection.find_one({"_id": gift_id})
+        finally:
+            await mongo.users_collection.delete_one({"_id": receiver_id})
+            await mongo.gifts_collection.delete_one({"_id": gift_id})
+
+        assert user_dict is not None and gift_dict is not None
+
+        latencies = sorted(latency for latency, _ in results)
+        successes = sum(succeeded for _, succeeded in results)
+
+        print(f"transactions: {mongo.supports_transactions}")
+        print(f"successful redemptions: {successes} (expected 1)")
+        print(f"receipts stored: {len(gift_dict['verified_receipts'])} (expected 1)")
+        print(f"points left: {user_dict['points']} (expected {PRICE_POINTS * 2})")
+        print(
+            f"latency p50 {statistics.median(latencies) * 1000:.2f} ms, "
+            f"max {latencies[-1] * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Checks that the hot service queries are answered by an index, not a collection scan.
+
+The filters come from the same helpers the services query with. Uses the regular
+`.env` settings and exits non-zero when any query scans. Run from the project root:
+`poetry run python -m benchmarks.index_usage`
+"""
+
+import asyncio
+import sys
+
+from bson import ObjectId
+
+from src import indexes, mongo
+from src.gifts import service as gifts_service
+from src.gifts.schemas import GiftFilter, GiftSort
+from src.leaderboard import service as leaderboard_service
+from src.quizes import service as quizes_service
+from src.users import service as users_service
+from src.users.schemas import User, UserRole
+
+
+async def main():
+    student = User(_id=ObjectId(), email="student@example.com", full_name="Student")
+    admin = User(_id=ObjectId(), email="admin@example.com", full_name="Admin", role=UserRole.admin)
+    quiz_ids = [ObjectId()]
+    gift_filter = GiftFilter(category="books", max_price=100, sort=GiftSort.price_asc)
+
+    async with mongo.lifespan(None), indexes.lifespan(None):
+        checked_queries = [
+            (mongo.users_collection, users_service.email_query("someone@example.com"), {}),
+            (mongo.users_collection, leaderboard_service.users_ahead_query(10), {}),
+            (
+                mongo.user_creation_requests_collection,
+                users_service.validation_token_query("token"),
+                {},
+            ),
+            (
+                mongo.quiz_completions_collection,
+                quizes_service.completions_query(student, quiz_ids),
+                {},
+            ),
+            (
+                mongo.quiz_completions_collection,
+                quizes_service.completions_query(admin, quiz_ids),
+                {},
+            ),
+            (
+                mongo.gifts_collection,
+                gifts_service.received_gifts_query(student, [ObjectId()]),
+                {},
+            ),
+            (
+                mongo.gifts_catalog_collection,
+                gift_filter.query(),
+                {"sort": [("price_points", 1), ("_id", 1)]},
+            ),
+            (mongo.quizes_catalog_collection, quizes_service.search_query("algebra"), {}),
+        ]
+
+        failures = 0
+        for collection, filter, kwargs in checked_queries:
+            try:
+                await indexes.assert_uses_index(collection, filter, **kwargs)
+            except AssertionError as error:
+                failures += 1
+                print(f"FAIL: {error}")
+            else:
+                print(f"ok: {collection.name} {filter}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""Serialization cost of the quiz and gift list routes, FastAPI's default path vs FastJSONResponse.
+
+The default path validates the returned models against the route's response_model,
+encodes them with `jsonable_encoder` and renders with the standard JSON encoder.
+
+Run from the project root: `poetry run python -m benchmarks.json_responses`
+"""
+
+import asyncio
+import time
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from src.gifts.router import router as gifts_router
+from src.gifts.schemas import GiftAdminResponse, VerifiedReceipt
+from src.quizes.router import router as quizes_router
+from src.quizes.schemas import QuizAdminResponse, QuizQuestionWithAnswer, VerifiedCompletion
+from src.responses import FastJSONResponse
+
+ITEMS = 100
+COMPLETIONS_PER_ITEM = 200
+ROUNDS = 20
+
+
+def _list_route(router) -> APIRoute:
+    return next(
+        route for route in router.routes if isinstance(route, APIRoute) and route.path.endswith("/")
+    )
+
+
+def _quizes() -> list[QuizAdminResponse]:
+    return [
+        QuizAdminResponse(
+            _id=ObjectId(),
+            title=f"Quiz {index}",
+            description="Benchmark quiz",
+            questions=[
+                QuizQuestionWithAnswer(
+                    tile=f"Question {question}",
+                    answer_options=["a", "b", "c", "d"],
+                    correct_answer_index=question % 4,
+                )
+                for question in range(10)
+            ],
+            points_per_answer=10,
+            verified_completions=[
+                VerifiedCompletion(
+                    user_id=ObjectId(),
+                    correct_answers=7,
+                    total_questions=10,
+                    earned_points=70,
+                    completed_timestamp=time.time(),
+                )
+                for _ in range(COMPLETIONS_PER_ITEM)
+            ],
+        )
+        for index in range(ITEMS)
+    ]
+
+
+def _gifts() -> list[GiftAdminResponse]:
+    return [
+        GiftAdminResponse(
+            _id=ObjectId(),
+            name=f"Gift {index}",
+            price_points=100,
+            category="Benchmark",
+            verified_receipts=[
+                VerifiedReceipt(receiver_id=ObjectId(), receipt_timestamp=time.time())
+                for _ in range(COMPLETIONS_PER_ITEM)
+            ],
+        )
+        for index in range(ITEMS)
+    ]
+
+
+async def _default_path(route: APIRoute, items: list) -> bytes:
+    content = await serialize_response(field=route.response_field, response_content=items)
+    return JSONResponse(content).body
+
+
+async def _fast_path(route: APIRoute, items: list) -> bytes:
+    return FastJSONResponse(items).body
+
+
+async def _measure(path, route: APIRoute, items: list) -> float:
+    started = time.perf_counter()
+
+    for _ in range(ROUNDS):
+        await path(route, items)
+
+    return (time.perf_counter() - started) / ROUNDS
+
+
+async def main():
+    for name, router, items in (
+        ("quizes", quizes_router, _quizes()),
+        ("gifts", gifts_router, _gifts()),
+    ):
+        route = _list_route(router)
+        default_body = await _default_path(route, items)
+        fast_body = await _fast_path(route, items)
+
+        default_time = await _measure(_default_path, route, items)
+        fast_time = await _measure(_fast_path, route, items)
+
+        print(
+            f"{name}: {len(fast_body) / 1024:.0f} KiB, default {default_time * 1000:.1f} ms, "
+            f"fast {fast_time * 1000:.1f} ms ({default_time / fast_time:.1f}x), "
+            f"identical output: {default_body == fast_body}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,491 @@
+"""Load test of the main flows against a throwaway local MongoDB.
+
+Boots `src.main:app` under uvicorn against a single-node replica set started
+from the `mongod` on PATH, with its data directory in /dev/shm when available,
+plus the local SMTP sink. It seeds users, quizes, completions and gifts into a
+database of its own, dropped afterwards so `--mongo-uri` runs can repeat, then
+drives login, quiz listing, quiz completion and gift redemption at a fixed
+concurrency. Per-endpoint p50/p95/p99 latency and throughput are written as
+JSON, and two such reports can be compared.
+
+Run from the project root:
+`poetry run python -m benchmarks.load_test run --output head.json`
+`poetry run python -m benchmarks.load_test compare base.json head.json`
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import aiohttp
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from passlib.context import CryptContext
+
+from benchmarks.smtp_sink import SMTPSink
+
+MONGO_USERNAME = "load_test"
+MONGO_PASSWORD = "load_test"
+MONGO_DATABASE = "load_test"
+JWT_SECRET = "load-test-secret"
+ROOT_EMAIL = "root@load.test"
+PASSWORD = "load-test-password"
+QUESTIONS_PER_QUIZ = 10
+# Every login comes from 127.0.0.1, the defaults would turn most of them into 429s
+UNTHROTTLED_BURST = "1000000"
+UNTHROTTLED_PER_MINUTE = "1000000"
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _percentile(ordered: list[float], percentile: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class MongoStandIn:
+    """Single-node replica set in a temporary directory, so transactions are available."""
+
+    def __init__(self, mongod: str):
+        self.mongod = mongod
+        self.port = _free_port()
+        shm = Path("/dev/shm")
+        self.dbpath = tempfile.mkdtemp(prefix="load-test-mongo-", dir=shm if shm.is_dir() else None)
+        self.process: subprocess.Popen | None = None
+
+    @property
+    def uri(self) -> str:
+        return f"mongodb://127.0.0.1:{self.port}/?replicaSet=rs0"
+
+    async def start(self):
+        self.process = subprocess.Popen(
+            [
+                self.mongod,
+                "--port",
+                str(self.port),
+                "--bind_ip",
+                "127.0.0.1",
+                "--dbpath",
+                self.dbpath,
+                "--replSet",
+                "rs0",
+                "--quiet",
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+
+        client = AsyncIOMotorClient(f"mongodb://127.0.0.1:{self.port}/?directConnection=true")
+        for _ in range(100):
+            try:
+                await client.admin.command("ping")
+                break
+            except Exception:
+                await asyncio.sleep(0.1)
+
+        await client.admin.command(
+            "replSetInitiate",
+            {"_id": "rs0", "members": [{"_id": 0, "host": f"127.0.0.1:{self.port}"}]},
+        )
+        while not (await client.admin.command("hello")).get("isWritablePrimary"):
+            await asyncio.sleep(0.1)
+
+        # The service always authenticates, the localhost exception allows creating the first user
+        await client.admin.command("createUser", MONGO_USERNAME, pwd=MONGO_PASSWORD, roles=["root"])
+        client.close()
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+        shutil.rmtree(self.dbpath, ignore_errors=True)
+
+
+class Service:
+    def __init__(self, mongo_uri: str, database_name: str, smtp_port: int, workers: int):
+        self.port = _free_port()
+        self.env = {
+            **os.environ,
+            "MONGO_HOST": mongo_uri,
+            "MONGO_DATABASE": database_name,
+            "MONGO_USERNAME": MONGO_USERNAME,
+            "MONGO_PASSWORD": MONGO_PASSWORD,
+            "JWT_SIGNING_SECRET_KEY": JWT_SECRET,
+            "ROOT_USER_EMAIL": ROOT_EMAIL,
+            "ROOT_USER_FULL_NAME": "Root",
+            "ROOT_USER_PASSWORD": PASSWORD,
+            "MAIL_USERNAME": "load-test",
+            "MAIL_PASSWORD": "load-test",
+            "MAIL_FROM": "noreply@load.test",
+            "MAIL_SERVER": "127.0.0.1",
+            "MAIL_PORT": str(smtp_port),
+            "MAIL_STARTTLS": "false",
+            "USE_CREDENTIALS": "false",
+            "LOGIN_THROTTLE_IP_BURST": UNTHROTTLED_BURST,
+            "LOGIN_THROTTLE_IP_PER_MINUTE": UNTHROTTLED_PER_MINUTE,
+            "LOGIN_THROTTLE_EMAIL_BURST": UNTHROTTLED_BURST,
+            "LOGIN_THROTTLE_EMAIL_PER_MINUTE": UNTHROTTLED_PER_MINUTE,
+        }
+        self.workers = workers
+        self.process: subprocess.Popen | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, session: aiohttp.ClientSession):
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "src.main:app",
+                "--port",
+                str(self.port),
+                "--workers",
+                str(self.workers),
+                "--log-level",
+                "warning",
+            ],
+            env=self.env,
+        )
+
+        for _ in range(300):
+            try:
+                async with session.get(f"{self.url}/docs") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+
+        raise RuntimeError("Service did not come up")
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+
+
+async def seed(mongo_uri: str, database_name: str, args: argparse.Namespace) -> dict:
+    """Inserts the data set straight into Mongo, sharing one bcrypt hash between all students."""
+    client = AsyncIOMotorClient(mongo_uri, username=MONGO_USERNAME, password=MONGO_PASSWORD)
+    database = client[database_name]
+    rng = random.Random(args.seed)
+
+    hashed_password = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+    students = [
+        {
+            "_id": ObjectId(),
+            "email": f"student{index}@load.test",
+            "full_name": f"Student {index}",
+            "role": "user",
+            "points": 1_000_000,
+            "hashed_password": hashed_password,
+        }
+        for index in range(args.users)
+    ]
+    await database.users.insert_many(students)
+
+    quizes = [
+        {
+            "_id": ObjectId(),
+            "title": f"Quiz {index}",
+            "description": "Seeded for the load test",
+            "questions": [
+                {
+                    "tile": f"Question {question}",
+                    "answer_options": ["a", "b", "c", "d"],
+                    "correct_answer_index": rng.randrange(4),
+                }
+                for question in range(QUESTIONS_PER_QUIZ)
+            ],
+            "points_per_answer": 10,
+        }
+        for index in range(args.quizes)
+    ]
+    await database.quizes.insert_many(quizes)
+
+    # History comes from the first half of the students, the flows use the second half
+    history_students = students[: len(students) // 2]
+    completions = [
+        {
+            "quiz_id": quiz["_id"],
+            "user_id": student["_id"],
+            "correct_answers": 5,
+            "total_questions": QUESTIONS_PER_QUIZ,
+            "earned_points": 50,
+            "completed_timestamp": time.time(),
+        }
+        for quiz in quizes
+        for student in rng.sample(history_students, min(args.completions, len(history_students)))
+    ]
+    if completions:
+        await database.quiz_completions.insert_many(completions)
+
+    gifts = [
+        {
+            "_id": ObjectId(),
+            "name": f"Gift {index}",
+            "price_points": 10,
+            "category": f"Category {index % 10}",
+            "verified_receipts": [
+                {"receiver_id": student["_id"], "receipt_timestamp": time.time()}
+                for student in rng.sample(history_students, min(20, len(history_students)))
+            ],
+        }
+        for index in range(args.gifts)
+    ]
+    await database.gifts.insert_many(gifts)
+
+    client.close()
+
+    return {
+        "students": students[len(students) // 2 :],
+        "quizes": quizes,
+        "gifts": gifts,
+    }
+
+
+def _token(user_id: ObjectId, email: str, role: str) -> str:
+    from jose import jwt
+
+    payload = {"id": str(user_id), "email": email, "full_name": email, "role": role}
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+async def run_flow(
+    name: str,
+    requests: int,
+    concurrency: int,
+    send: Callable[[int], Awaitable[int]],
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    throttled = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors, throttled
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+
+            started = time.perf_counter()
+            status = await send(index)
+            latencies.append(time.perf_counter() - started)
+
+            # A throttled request is cheap and would flatter the latency, it is not an error either
+            if status == 429:
+                throttled += 1
+            elif status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "throttled": throttled,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+    print(
+        f"{name:>16}: {result['throughput_rps']:8.1f} req/s, p50 {result['p50_ms']:8.2f} ms, "
+        f"p95 {result['p95_ms']:8.2f} ms, p99 {result['p99_ms']:8.2f} ms, {errors} errors, "
+        f"{throttled} throttled"
+    )
+    return result
+
+
+async def drive(service: Service, session: aiohttp.ClientSession, data: dict, args) -> dict:
+    url = service.url
+    students = data["students"]
+    quizes = data["quizes"]
+    gifts = data["gifts"]
+    rng = random.Random(args.seed)
+
+    student_tokens = [_token(s["_id"], s["email"], "user") for s in students]
+    client = AsyncIOMotorClient(
+        service.env["MONGO_HOST"], username=MONGO_USERNAME, password=MONGO_PASSWORD
+    )
+    root_user = await client[service.env["MONGO_DATABASE"]].users.find_one({"email": ROOT_EMAIL})
+    client.close()
+    admin_headers = {"Authorization": f"Bearer {_token(root_user['_id'], ROOT_EMAIL, 'admin')}"}
+
+    # Every (student, quiz) and (student, gift) pair is used once, so no request is a duplicate
+    completion_pairs = [(s, q) for s in range(len(students)) for q in range(len(quizes))]
+    redemption_pairs = [(s, g) for s in range(len(students)) for g in range(len(gifts))]
+    rng.shuffle(completion_pairs)
+    rng.shuffle(redemption_pairs)
+
+    async def login(index: int) -> int:
+        student = students[index % len(students)]
+        form = {"username": student["email"], "password": PASSWORD}
+        async with session.post(f"{url}/tokens/", data=form) as response:
+            await response.read()
+            return response.status
+
+    async def list_quizes(index: int) -> int:
+        headers = {"Authorization": f"Bearer {student_tokens[index % len(students)]}"}
+        async with session.get(f"{url}/quizes/", headers=headers) as response:
+            await response.read()
+            return response.status
+
+    async def complete_quiz(index: int) -> int:
+        student_index, quiz_index = completion_pairs[index % len(completion_pairs)]
+        headers = {"Authorization": f"Bearer {student_tokens[student_index]}"}
+        answers = {"correct_answer_indexes": [rng.randrange(4) for _ in range(QUESTIONS_PER_QUIZ)]}
+        quiz_url = f"{url}/quizes/{quizes[quiz_index]['_id']}/verified-completion"
+        async with session.post(quiz_url, json=answers, headers=headers) as response:
+            await response.read()
+            return response.status
+
+    async def redeem_gift(index: int) -> int:
+        student_index, gift_index = redemption_pairs[index % len(redemption_pairs)]
+        body = {"receiver_id": str(students[student_index]["_id"])}
+        gift_url = f"{url}/gifts/{gifts[gift_index]['_id']}/verified-receival"
+        async with session.post(gift_url, json=body, headers=admin_headers) as response:
+            await response.read()
+            return response.status
+
+    flows = {
+        "login": (login, args.login_requests),
+        "list_quizes": (list_quizes, args.requests),
+        "complete_quiz": (complete_quiz, min(args.requests, len(completion_pairs))),
+        "redeem_gift": (redeem_gift, min(args.requests, len(redemption_pairs))),
+    }
+
+    return {
+        name: await run_flow(name, requests, args.concurrency, send)
+        for name, (send, requests) in flows.items()
+    }
+
+
+async def drop_database(mongo_uri: str, database_name: str):
+    client = AsyncIOMotorClient(mongo_uri, username=MONGO_USERNAME, password=MONGO_PASSWORD)
+    await client.drop_database(database_name)
+    client.close()
+
+
+async def run(args: argparse.Namespace):
+    mongo_stand_in = None
+    mongo_uri = args.mongo_uri
+    if mongo_uri is None:
+        mongod = args.mongod or shutil.which("mongod")
+        if mongod is None:
+            raise SystemExit("mongod not found, pass --mongod or --mongo-uri")
+        mongo_stand_in = MongoStandIn(mongod)
+        await mongo_stand_in.start()
+        mongo_uri = mongo_stand_in.uri
+
+    # Unique per run, a shared server keeps no seeded users around for the next run to collide with
+    database_name = f"{MONGO_DATABASE}_{ObjectId()}"
+
+    smtp_sink = SMTPSink(port=0)
+    await smtp_sink.start()
+    service = Service(mongo_uri, database_name, smtp_sink.port, args.workers)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            data = await seed(mongo_uri, database_name, args)
+            await service.start(session)
+            results = await drive(service, session, data, args)
+    finally:
+        service.stop()
+        await smtp_sink.stop()
+        if mongo_stand_in is not None:
+            mongo_stand_in.stop()
+        else:
+            await drop_database(mongo_uri, database_name)
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("command", "output")
+        },
+        "results": results,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+
+def compare(args: argparse.Namespace):
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+
+    print(f"base {base['commit']} -> head {head['commit']}")
+    for flow, head_result in head["results"].items():
+        base_result = base["results"].get(flow)
+        if base_result is None:
+            continue
+
+        changes = []
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = (head_result[metric] - base_result[metric]) / base_result[metric] * 100
+            changes.append(f"{metric} {head_result[metric]:9.2f} ({change:+6.1f}%)")
+        print(f"{flow:>16}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--mongo-uri", help="use this server instead of starting mongod")
+    run_parser.add_argument("--mongod", help="path of the mongod binary to start")
+    run_parser.add_argument("--workers", type=int, default=1)
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--requests", type=int, default=2000)
+    run_parser.add_argument("--login-requests", type=int, default=200)
+    run_parser.add_argument("--users", type=int, default=2000)
+    run_parser.add_argument("--quizes", type=int, default=200)
+    run_parser.add_argument("--completions", type=int, default=200)
+    run_parser.add_argument("--gifts", type=int, default=50)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run(args))
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
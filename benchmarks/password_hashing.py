@@ -0,0 +1,124 @@
+"""Login burst vs. unrelated request latency, with and without the bcrypt pool.
+
+The unrelated request is GET /metrics, served through FastAPI on the same event
+loop as the logins. Its latency is counted from when the probe was due, so time
+spent waiting for a blocked loop counts as well as the request itself.
+
+Run from the project root: `poetry run python -m benchmarks.password_hashing`
+"""
+
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI
+
+from benchmarks.environment import use_placeholder_settings
+from src import config
+from src.monitoring.router import metrics_router
+from src.users import hashing
+
+LOGINS = 64
+PROBE_INTERVAL = 0.005
+
+
+def _percentile(samples: list[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+async def _get(app: FastAPI, path: str) -> int:
+    """Sends a GET straight through the ASGI interface, no HTTP client needed."""
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    await app(scope, receive, send)
+
+    return status
+
+
+async def _probe(app: FastAPI, stop: asyncio.Event, samples: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        status = await _get(app, "/metrics")
+        # Lateness against the scheduled start, a blocked loop delays the wake-up too
+        samples.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+        if status != 200:
+            raise RuntimeError(f"GET /metrics answered {status}")
+
+
+async def _run(pool: str) -> dict:
+    config.configure(
+        config.get_settings().model_copy(
+            update={
+                "password_hasher_pool": pool,
+                "password_hasher_max_queue": LOGINS,
+                "password_hasher_timeout": 60.0,
+            }
+        )
+    )
+
+    hashed_password = hashing.crypt_context.hash("password")
+
+    app = FastAPI()
+    app.include_router(metrics_router)
+
+    async with hashing.lifespan(None):
+        stop = asyncio.Event()
+        samples: list[float] = []
+        probe = asyncio.create_task(_probe(app, stop, samples))
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(hashing.verify_password("password", hashed_password) for _ in range(LOGINS))
+        )
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await probe
+
+    return {
+        "pool": pool,
+        "logins_per_second": LOGINS / elapsed,
+        "probe_p50_ms": statistics.median(samples) * 1000,
+        "probe_p99_ms": _percentile(samples, 0.99) * 1000,
+    }
+
+
+async def main():
+    use_placeholder_settings()
+
+    for pool in ("inline", "thread", "process"):
+        result = await _run(pool)
+        print(
+            f"{result['pool']:>8}: {result['logins_per_second']:8.1f} logins/s, "
+            f"unrelated p50 {result['probe_p50_ms']:8.2f} ms, "
+            f"p99 {result['probe_p99_ms']:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
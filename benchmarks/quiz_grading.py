@@ -0,0 +1,93 @@
+"""Grading cost of quiz completions, the former per-submission path vs cached answer keys.
+
+The former path validated the whole quiz into a `Quiz` model for every submission
+and compared answers in a Python loop. Both are timed for a single large quiz and
+for an exam-day burst of submissions against one quiz.
+
+Run from the project root: `poetry run python -m benchmarks.quiz_grading`
+"""
+
+import random
+import time
+
+from bson import ObjectId
+
+from src.quizes.grading import build_answer_key, grade, grade_many
+from src.quizes.schemas import Quiz
+
+
+def _quiz_dict(questions: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "title": "Benchmark quiz",
+        "questions": [
+            {
+                "tile": f"Question {index}",
+                "answer_options": ["a", "b", "c", "d"],
+                "correct_answer_index": random.randrange(4),
+            }
+            for index in range(questions)
+        ],
+        "points_per_answer": 10,
+    }
+
+
+def _former_grade(quiz_dict: dict, answer_indexes: list[int]) -> int:
+    quiz = Quiz(**quiz_dict)
+
+    correct_answers = 0
+    for question_index, provided_correct_answer_index in enumerate(answer_indexes):
+        if provided_correct_answer_index == quiz.questions[question_index].correct_answer_index:
+            correct_answers += 1
+
+    return correct_answers * quiz.points_per_answer
+
+
+def _timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def large_quiz(questions: int, rounds: int = 20):
+    quiz_dict = _quiz_dict(questions)
+    answer_indexes = [random.randrange(4) for _ in range(questions)]
+    answer_key = build_answer_key(quiz_dict)
+
+    former = sum(_timed(_former_grade, quiz_dict, answer_indexes) for _ in range(rounds)) / rounds
+    keyed = sum(_timed(grade, answer_key, answer_indexes) for _ in range(rounds)) / rounds
+    assert grade(answer_key, answer_indexes).earned_points == _former_grade(
+        quiz_dict, answer_indexes
+    )
+
+    print(
+        f"{questions:>6} questions: former {former * 1e6:9.1f} us, "
+        f"answer key {keyed * 1e6:8.1f} us ({former / keyed:.0f}x)"
+    )
+
+
+def exam_burst(submissions: int, questions: int):
+    quiz_dict = _quiz_dict(questions)
+    burst = [[random.randrange(4) for _ in range(questions)] for _ in range(submissions)]
+
+    former = _timed(lambda: [_former_grade(quiz_dict, answers) for answers in burst])
+    answer_key = build_answer_key(quiz_dict)
+    batched = _timed(grade_many, answer_key, burst)
+
+    print(
+        f"{submissions} submissions x {questions} questions: former {former * 1000:.1f} ms, "
+        f"grade_many {batched * 1000:.1f} ms ({former / batched:.0f}x)"
+    )
+
+
+def main():
+    random.seed(42)
+
+    for questions in (10, 100, 1_000, 10_000):
+        large_quiz(questions)
+
+    exam_burst(10_000, 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Quiz search latency over a seeded collection of tens of thousands of quizes.
+
+Compares downloading every quiz and matching words in Python, which is what
+clients had to do before, with the text index for a rare and a common word, on
+a cache miss, on a deep page and with a warm catalog cache. Uses the regular
+`.env` settings and works in scratch collections. Run from the project root:
+`poetry run python -m benchmarks.quiz_search`
+"""
+
+import asyncio
+import random
+import statistics
+import time
+
+from bson import ObjectId
+
+from src import mongo
+from src.pagination import Page
+from src.quizes import service as quizes_service
+from src.quizes.schemas import indexes as quizes_indexes
+from src.users.schemas import User
+
+QUIZES = 30_000
+QUESTIONS = 10
+INSERT_BATCH_SIZE = 1000
+TOPICS = 1000
+SEARCHED_PAGES = 5
+ROUNDS = 20
+
+WORDS = [
+    "algebra",
+    "biology",
+    "chemistry",
+    "geometry",
+    "history",
+    "literature",
+    "music",
+    "physics",
+    "poetry",
+    "geography",
+    "astronomy",
+    "economics",
+    "grammar",
+    "painting",
+    "philosophy",
+    "statistics",
+    "zoology",
+    "botany",
+    "ecology",
+    "robotics",
+]
+# Each quiz has one of the topics in its title, while nearly every quiz has the common words
+RARE_SEARCH_TEXT = "topic42"
+COMMON_SEARCH_TEXT = "astronomy physics"
+
+
+def _sentence(generator: random.Random, length: int) -> str:
+    return " ".join(generator.choice(WORDS) for _ in range(length))
+
+
+def _quiz_dict(generator: random.Random) -> dict:
+    return {
+        "_id": ObjectId(),
+        "title": f"{_sentence(generator, 3)} topic{generator.randrange(TOPICS)}",
+        "description": _sentence(generator, 12),
+        "questions": [
+            {
+                "tile": _sentence(generator, 8),
+                "answer_options": ["a", "b", "c", "d"],
+                "correct_answer_index": 1,
+            }
+            for _ in range(QUESTIONS)
+        ],
+        "points_per_answer": 1,
+        "revision": 1,
+    }
+
+
+async def _measure(name: str, run) -> None:
+    latencies = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        await run()
+        latencies.append(time.perf_counter() - started)
+
+    print(
+        f"{name:>20}: p50 {statistics.median(latencies) * 1000:8.2f} ms, "
+        f"max {max(latencies) * 1000:8.2f} ms"
+    )
+
+
+async def main():
+    async with mongo.lifespan(None):
+        database = mongo.database
+        quizes_collection = database.get_collection("benchmark_quizes")
+        completions_collection = database.get_collection("benchmark_quiz_completions")
+        await quizes_collection.create_indexes(quizes_indexes["quizes"])
+        await completions_collection.create_index([("quiz_id", 1), ("user_id", 1)], unique=True)
+
+        generator = random.Random(0)
+        for _ in range(0, QUIZES, INSERT_BATCH_SIZE):
+            await quizes_collection.insert_many(
+                [_quiz_dict(generator) for _ in range(INSERT_BATCH_SIZE)]
+            )
+
+        student = User(_id=ObjectId(), email="student@benchmark.local", full_name="Student")
+        searched_words = set(RARE_SEARCH_TEXT.split())
+
+        async def download_and_match():
+            matches = []
+            async for quiz_dict in quizes_collection.find({}, {"verified_completions": False}):
+                text = " ".join(
+                    [quiz_dict["title"], quiz_dict["description"]]
+                    + [question["tile"] for question in quiz_dict["questions"]]
+                )
+                if searched_words & set(text.split()):
+                    matches.append(quiz_dict)
+
+        # Point the service at the scratch collections
+        mongo.quizes_catalog_collection = quizes_collection
+        mongo.quiz_completions_collection = completions_collection
+
+        page = Page(limit=quizes_service.SEARCH_PAGE_LIMIT)
+        deep_page = page
+        for _ in range(SEARCHED_PAGES):
+            quizes = await quizes_service.search_quizes(student, COMMON_SEARCH_TEXT, deep_page)
+            deep_page = Page(limit=page.limit, after=quizes[-1].id)
+
+        def search_miss(text: str, searched_page: Page):
+            async def run():
+                quizes_service.invalidate_quizes_cache()
+                await quizes_service.search_quizes(student, text, searched_page)
+
+            return run
+
+        async def common_hit():
+            await quizes_service.search_quizes(student, COMMON_SEARCH_TEXT, page)
+
+        try:
+            await _measure("download + python", download_and_match)
+            await _measure("rare word (miss)", search_miss(RARE_SEARCH_TEXT, page))
+            await _measure("common words (miss)", search_miss(COMMON_SEARCH_TEXT, page))
+            await _measure(
+                f"common, page {SEARCHED_PAGES + 1}", search_miss(COMMON_SEARCH_TEXT, deep_page)
+            )
+            await _measure("common words (hit)", common_hit)
+        finally:
+            await quizes_collection.drop()
+            await completions_collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
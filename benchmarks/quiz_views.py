@@ -0,0 +1,128 @@
+"""Student quiz list latency for quizes with thousands of completions.
+
+Compares the old read path (whole quiz documents with embedded completions,
+validated twice in Python) with the aggregation pipeline on a cache miss, with
+a warm catalog cache and streamed as ndjson. Uses the regular `.env` settings
+and works in scratch collections. Run from the project root:
+`poetry run python -m benchmarks.quiz_views`
+"""
+
+import asyncio
+import statistics
+import time
+
+from bson import ObjectId
+
+from src import mongo
+from src.quizes import service as quizes_service
+from src.quizes.schemas import QuizResponse
+from src.users.schemas import User
+
+QUIZES = 20
+QUESTIONS = 20
+COMPLETIONS_PER_QUIZ = 5000
+ROUNDS = 20
+
+
+def _quiz_dict(quiz_id: ObjectId) -> dict:
+    return {
+        "_id": quiz_id,
+        "title": f"Quiz {quiz_id}",
+        "description": "Benchmark quiz",
+        "questions": [
+            {
+                "tile": f"Question {index}",
+                "answer_options": ["a", "b", "c", "d"],
+                "correct_answer_index": 1,
+            }
+            for index in range(QUESTIONS)
+        ],
+        "points_per_answer": 1,
+    }
+
+
+def _completion_dict(quiz_id: ObjectId, user_id: ObjectId) -> dict:
+    return {
+        "quiz_id": quiz_id,
+        "user_id": user_id,
+        "correct_answers": QUESTIONS,
+        "total_questions": QUESTIONS,
+        "earned_points": QUESTIONS,
+        "completed_timestamp": time.time(),
+    }
+
+
+async def _measure(name: str, run) -> None:
+    latencies = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        await run()
+        latencies.append(time.perf_counter() - started)
+
+    print(
+        f"{name:>18}: p50 {statistics.median(latencies) * 1000:8.2f} ms, "
+        f"max {max(latencies) * 1000:8.2f} ms"
+    )
+
+
+async def main():
+    async with mongo.lifespan(None):
+        database = mongo.database
+        legacy_collection = database.get_collection("benchmark_legacy_quizes")
+        quizes_collection = database.get_collection("benchmark_quizes")
+        completions_collection = database.get_collection("benchmark_quiz_completions")
+        await completions_collection.create_index([("quiz_id", 1), ("user_id", 1)], unique=True)
+
+        student = User(_id=ObjectId(), email="student@benchmark.local", full_name="Student")
+        quiz_ids = [ObjectId() for _ in range(QUIZES)]
+
+        for quiz_id in quiz_ids:
+            completions = [
+                _completion_dict(quiz_id, ObjectId()) for _ in range(COMPLETIONS_PER_QUIZ)
+            ]
+            completions[-1]["user_id"] = student.id
+
+            await legacy_collection.insert_one(
+                {**_quiz_dict(quiz_id), "verified_completions": completions}
+            )
+            await quizes_collection.insert_one(_quiz_dict(quiz_id))
+            await completions_collection.insert_many(completions)
+
+        async def legacy_read_path():
+            quiz_dicts = await legacy_collection.find({}).to_list(None)
+            for quiz_dict in quiz_dicts:
+                verified_completion = any(
+                    ObjectId(completion["user_id"]) == student.id
+                    for completion in quiz_dict["verified_completions"]
+                )
+                QuizResponse(verified_completion=verified_completion, **quiz_dict)
+
+        async def pipeline_read_path():
+            quizes_service.invalidate_quizes_cache()
+            await quizes_service.find_all_quizes(student)
+
+        async def cached_read_path():
+            await quizes_service.find_all_quizes(student)
+
+        async def streamed_read_path():
+            async for _ in quizes_service.iterate_quizes(student):
+                pass
+
+        # Point the service at the scratch collections, list reads go through the catalog one
+        mongo.quizes_collection = quizes_collection
+        mongo.quizes_catalog_collection = quizes_collection
+        mongo.quiz_completions_collection = completions_collection
+
+        try:
+            await _measure("embedded + python", legacy_read_path)
+            await _measure("pipeline (miss)", pipeline_read_path)
+            await _measure("cache (hit)", cached_read_path)
+            await _measure("stream (ndjson)", streamed_read_path)
+        finally:
+            await legacy_collection.drop()
+            await quizes_collection.drop()
+            await completions_collection.drop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
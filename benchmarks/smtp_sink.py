@@ -0,0 +1,93 @@
+"""Local SMTP stand-in that accepts every message and keeps it in memory.
+
+Point the service at it with MAIL_SERVER=localhost, MAIL_PORT=1025,
+MAIL_STARTTLS=false and USE_CREDENTIALS=false. Run from the project root:
+`poetry run python -m benchmarks.smtp_sink [port]`
+"""
+
+import asyncio
+import sys
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReceivedMessage:
+    sender: str
+    recipients: list[str]
+    data: bytes
+
+
+@dataclass
+class SMTPSink:
+    host: str = "127.0.0.1"
+    port: int = 1025
+    messages: list[ReceivedMessage] = field(default_factory=list)
+    sessions: int = 0
+    _server: asyncio.AbstractServer | None = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_session, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions += 1
+        sender, recipients = "", []
+
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 smtp-sink ready")
+
+        while line := await reader.readline():
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                await reply("250 smtp-sink")
+            elif verb == "MAIL":
+                sender, recipients = command.partition(":")[2].strip(" <>"), []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.partition(":")[2].strip(" <>"))
+                await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                data = bytearray()
+                while (data_line := await reader.readline()) not in (b".\r\n", b""):
+                    data += data_line
+                self.messages.append(ReceivedMessage(sender, recipients, bytes(data)))
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            elif verb in ("RSET", "NOOP"):
+                await reply("250 OK")
+            else:
+                await reply("502 Command not implemented")
+
+        writer.close()
+
+
+async def main():
+    sink = SMTPSink(port=int(sys.argv[1]) if len(sys.argv) > 1 else 1025)
+    await sink.start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}")
+
+    try:
+        while True:
+            received = len(sink.messages)
+            await asyncio.sleep(5)
+            if len(sink.messages) != received:
+                print(f"{len(sink.messages)} messages over {sink.sessions} sessions")
+    finally:
+        await sink.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+from typing import AsyncIterator, Awaitable, Callable
+
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+BULK_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+NDJSON_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}},
+    }
+}
+
+
+class BulkImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class BulkImportResponse(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: list[BulkImportError] = []
+
+
+async def iterate_ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    """Splits a streamed body into numbered non-blank lines without buffering all of it."""
+    line_number = 0
+    remainder = b""
+
+    async for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+
+    if remainder.strip():
+        yield line_number + 1, remainder
+
+
+async def import_ndjson(
+    chunks: AsyncIterator[bytes],
+    model: type[BaseModel],
+    to_document: Callable[[BaseModel], dict],
+    insert_many: Callable[[list[dict]], Awaitable],
+) -> BulkImportResponse:
+    """Validates every line against `model` and inserts the valid ones in unordered batches."""
+    response = BulkImportResponse()
+    batch: list[tuple[int, dict]] = []
+
+    def report(line_number: int, detail: str):
+        response.failed += 1
+        if len(response.errors) < MAX_REPORTED_ERRORS:
+            response.errors.append(BulkImportError(line=line_number, detail=detail))
+
+    async def flush():
+        try:
+            await insert_many([document for _, document in batch])
+            response.inserted += len(batch)
+        except BulkWriteError as error:
+            write_errors = error.details["writeErrors"]
+            response.inserted += len(batch) - len(write_errors)
+            for write_error in write_errors:
+                report(batch[write_error["index"]][0], write_error["errmsg"])
+        batch.clear()
+
+    async for line_number, line in iterate_ndjson_lines(chunks):
+        try:
+            document = to_document(model.model_validate_json(line))
+        except ValidationError as error:
+            report(line_number, _format_validation_error(error))
+            continue
+
+        batch.append((line_number, document))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    return response
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, detail['loc'])) or 'line'}: {detail['msg']}"
+        for detail in error.errors()
+    )
@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+caches: dict[str, "TTLCache"] = {}
+
+
+class TTLCache(Generic[K, V]):
+    """Size-bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    `max_entries` and `ttl` may be given as callables, read on use, so module level
+    caches do not load the settings at import time.
+
+    Every eviction bumps `generation`. A reader captures it before loading a missing
+    entry and passes it to `set()`, which drops the value if an eviction happened
+    meanwhile, so a load that raced a write cannot bring the pre-write data back.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int | Callable[[], int],
+        ttl: float | Callable[[], float],
+    ):
+        self.name = name
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+        caches[name] = self
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries() if callable(self._max_entries) else self._max_entries
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl() if callable(self._ttl) else self._ttl
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None, generation: int | None = None):
+        """Stores `value`, `ttl` may shorten the cache-wide TTL for this entry only.
+
+        Nothing is stored when `generation` is given and the cache was evicted since.
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        if ttl is not None:
+            ttl = min(ttl, self.ttl)
+        else:
+            ttl = self.ttl
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        max_entries = self.max_entries
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K):
+        self._entries.pop(key, None)
+        self.generation += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
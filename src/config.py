@@ -1,21 +1,49 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     mongo_host: str = "mongodb://localhost:27017/"
     mongo_database: str = "college_project"
     mongo_username: str
     mongo_password: str
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int | None = None
+    mongo_wait_queue_timeout_ms: int | None = None
+    mongo_connect_timeout_ms: int = 20_000
+    mongo_server_selection_timeout_ms: int = 30_000
+    # Comma separated in order of preference, zstd and snappy need their python packages
+    mongo_compressors: str | None = None
+    mongo_catalog_read_preference: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"
+    mongo_catalog_max_staleness_seconds: int = -1
 
     jwt_signing_secret_key: str
     jwt_signing_algorithm: str = "HS256"
+    token_cache_max_entries: int = 10_000
+    token_cache_ttl: float = 300.0
 
     root_user_email: str
     root_user_full_name: str
     root_user_password: str
 
+    password_hasher_pool: Literal["thread", "process", "inline"] = "thread"
+    password_hasher_max_workers: int = 2
+    password_hasher_max_queue: int = 64
+    password_hasher_timeout: float = 5.0
+
+    catalog_cache_max_entries: int = 256
+    catalog_cache_ttl: float = 60.0
+    answer_key_cache_max_entries: int = 4096
+    answer_key_cache_ttl: float = 300.0
+    leaderboard_cache_max_entries: int = 1024
+    leaderboard_cache_ttl: float = 10.0
+
     mail_username: str
     mail_password: str
     mail_from: str
@@ -27,7 +55,56 @@ class Settings(BaseSettings):
     use_credentials: bool = True
     validate_certs: bool = True
     mail_template_folder: str = "templates"
+    mail_outbox_batch_size: int = 50
+    mail_outbox_poll_interval: float = 5.0
+    mail_outbox_lease: float = 60.0
+    mail_outbox_max_attempts: int = 8
+    mail_outbox_retry_base_delay: float = 10.0
+    mail_outbox_retry_max_delay: float = 3600.0
+
+    slow_command_threshold_ms: float | None = None
+    slow_command_log_max_bytes: int = 16 * 1024 * 1024
+
+    throttle_store: Literal["memory", "mongo"] = "memory"
+    throttle_max_keys: int = 100_000
+    login_throttle_ip_burst: int = 20
+    login_throttle_ip_per_minute: float = 20.0
+    login_throttle_email_burst: int = 5
+    login_throttle_email_per_minute: float = 5.0
+    sign_up_throttle_ip_burst: int = 5
+    sign_up_throttle_ip_per_minute: float = 2.0
+    sign_up_throttle_email_burst: int = 3
+    sign_up_throttle_email_per_minute: float = 1.0
+
+    cache_invalidation_mode: Literal["auto", "change_stream", "poll", "off"] = "auto"
+    cache_invalidation_poll_interval: float = 1.0
+
+    health_check_timeout: float = 2.0
+    startup_lock_lease: float = 120.0
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Reads the environment on first use, so importing the app needs no configuration."""
+    global _settings
+
+    if _settings is None:
+        _settings = Settings()  # type: ignore
+
+    return _settings
+
+
+def configure(new_settings: Settings):
+    """Replaces the settings, must happen before the first setting is read."""
+    global _settings
+    _settings = new_settings
+
 
+class _LazySettings:
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
 
-settings = Settings() # type: ignore
 
+settings: Settings = _LazySettings()  # type: ignore
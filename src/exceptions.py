@@ -1,5 +1,7 @@
+import math
 from typing import Any
 from fastapi import HTTPException
+from starlette import status
 
 
 class DetailedHTTPException(HTTPException):
@@ -11,3 +13,12 @@ class DetailedHTTPException(HTTPException):
         super().__init__(
             status_code=self.status_code, detail=self.detail, headers=self.headers
         )
+
+
+class TooManyAttempts(DetailedHTTPException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    detail = "Too many attempts, please retry later"
+
+    def __init__(self, retry_after: float) -> None:
+        self.headers = {"Retry-After": str(math.ceil(retry_after))}
+        super().__init__()
@@ -0,0 +1,24 @@
+from typing import Annotated
+
+from fastapi import Depends, Query
+
+from src.gifts.schemas import GiftFilter, GiftSort
+from src.users import service as users_service
+from src.users.dependencies import get_current_user
+from src.users.schemas import User
+
+
+async def query_param_gift_filter(
+    current_user: Annotated[User, Depends(get_current_user)],
+    category: str | None = None,
+    min_price: Annotated[int | None, Query(ge=0)] = None,
+    max_price: Annotated[int | None, Query(ge=0)] = None,
+    affordable: bool = False,
+    sort: GiftSort = GiftSort.id,
+) -> GiftFilter:
+    if affordable:
+        # Points are not part of the token, they change with every completion and redemption
+        points = await users_service.find_user_points(current_user.id)
+        max_price = points if max_price is None else min(max_price, points)
+
+    return GiftFilter(category=category, min_price=min_price, max_price=max_price, sort=sort)
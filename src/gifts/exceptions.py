@@ -15,3 +15,18 @@ class GiftAlreadyReceived(DetailedHTTPException):
 class NotEnoughPoints(DetailedHTTPException):
     status_code = status.HTTP_400_BAD_REQUEST
     detail = "User does not have enough points to verify receipt"
+
+
+class GiftPageStartNotFound(DetailedHTTPException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Gift to continue the page after no longer exists"
+
+
+class GiftImageNotFound(DetailedHTTPException):
+    status_code = status.HTTP_404_NOT_FOUND
+    detail = "Gift image not found"
+
+
+class UnsupportedGiftImage(DetailedHTTPException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    detail = "Gift image must be a PNG, JPEG, GIF or WebP image"
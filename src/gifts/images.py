@@ -0,0 +1,119 @@
+from io import BytesIO
+
+from bson.objectid import ObjectId
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridOut
+from PIL import Image, UnidentifiedImageError
+
+from src import mongo
+from .exceptions import GiftImageNotFound
+from .schemas import GiftImageSize
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+VARIANT_WIDTHS = {
+    GiftImageSize.small: 160,
+    GiftImageSize.medium: 480,
+    GiftImageSize.large: 960,
+}
+VARIANT_FORMAT = "WEBP"
+VARIANT_CONTENT_TYPE = "image/webp"
+VARIANT_QUALITY = 80
+
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def detect_content_type(binary: bytes) -> str | None:
+    """Detects the image type from its leading bytes, regardless of what the client claimed."""
+    for signature, content_type in _SIGNATURES:
+        if binary.startswith(signature):
+            return content_type
+
+    if binary[:4] == b"RIFF" and binary[8:12] == b"WEBP":
+        return "image/webp"
+
+    return None
+
+
+def render_variants(binary: bytes) -> dict[GiftImageSize, bytes]:
+    """Decodes the image and encodes a downscaled copy for every variant narrower than it.
+
+    CPU bound, meant to be run in a worker thread. Raises ValueError on undecodable images.
+    """
+    try:
+        with Image.open(BytesIO(binary)) as image:
+            image.load()
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as error:
+        raise ValueError("Gift image cannot be decoded") from error
+
+    variants = {}
+    for size, width in VARIANT_WIDTHS.items():
+        if image.width <= width:
+            continue
+
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+
+        output = BytesIO()
+        resized.save(output, format=VARIANT_FORMAT, quality=VARIANT_QUALITY)
+        variants[size] = output.getvalue()
+
+    return variants
+
+
+async def store_gift_image(
+    gift_id: ObjectId,
+    binary: bytes,
+    content_type: str | None,
+    size: GiftImageSize | None = None,
+) -> ObjectId:
+    metadata = {"gift_id": gift_id, "content_type": content_type or DEFAULT_CONTENT_TYPE}
+    if size is not None:
+        metadata["size"] = size.value
+
+    return await mongo.gift_images_bucket.upload_from_stream(
+        str(gift_id), binary, metadata=metadata
+    )
+
+
+async def find_original_gift_image_id(gift_id: ObjectId) -> ObjectId | None:
+    """Finds an already uploaded original of the gift's image, variants are skipped."""
+    cursor = mongo.gift_images_bucket.find(
+        {"metadata.gift_id": gift_id, "metadata.size": {"$exists": False}},
+        sort=[("uploadDate", -1)],
+        limit=1,
+    )
+
+    async for grid_out in cursor:
+        return grid_out._id
+
+    return None
+
+
+async def open_gift_image(image_id: ObjectId) -> AsyncIOMotorGridOut:
+    try:
+        return await mongo.gift_images_bucket.open_download_stream(image_id)
+    except NoFile:
+        raise GiftImageNotFound
+
+
+async def delete_gift_image(image_id: ObjectId):
+    try:
+        await mongo.gift_images_bucket.delete(image_id)
+    except NoFile:
+        pass
+
+
+def image_content_type(grid_out: AsyncIOMotorGridOut) -> str:
+    return (grid_out.metadata or {}).get("content_type", DEFAULT_CONTENT_TYPE)
+
+
+def image_etag(grid_out: AsyncIOMotorGridOut) -> str:
+    # Stored images are never modified in place, a new upload gets a new file id
+    return f'"{grid_out._id}"'
@@ -0,0 +1,45 @@
+from bson import ObjectId
+
+from src import mongo
+from src.gifts import service as gifts_service
+from .images import detect_content_type, find_original_gift_image_id, store_gift_image
+
+
+async def move_embedded_images():
+    """Moves raw image bytes embedded in gift documents into GridFS.
+
+    Idempotent: a gift is only switched over to `image_id` once its image is stored, and an
+    image uploaded by a run that stopped before the switch is reused instead of uploaded again.
+    """
+    cursor = mongo.gifts_collection.find({"image": {"$exists": True}}, {"image": True})
+
+    async for gift_dict in cursor:
+        image_id = await find_original_gift_image_id(gift_dict["_id"])
+
+        if image_id is None:
+            binary = gift_dict["image"]
+            image_id = await store_gift_image(gift_dict["_id"], binary, detect_content_type(binary))
+
+        await mongo.gifts_collection.update_one(
+            {"_id": gift_dict["_id"]},
+            {"$set": {"image_id": image_id}, "$unset": {"image": ""}},
+        )
+
+        await gifts_service.generate_gift_image_variants(gift_dict["_id"], image_id)
+
+
+async def normalize_receipt_receiver_ids():
+    """Converts receipt receiver ids that used to be stored as hex strings into ObjectIds."""
+    cursor = mongo.gifts_collection.find(
+        {"verified_receipts.receiver_id": {"$type": "string"}}, {"verified_receipts": True}
+    )
+
+    async for gift_dict in cursor:
+        receipt_dicts = [
+            {**receipt_dict, "receiver_id": ObjectId(receipt_dict["receiver_id"])}
+            for receipt_dict in gift_dict["verified_receipts"]
+        ]
+
+        await mongo.gifts_collection.update_one(
+            {"_id": gift_dict["_id"]}, {"$set": {"verified_receipts": receipt_dicts}}
+        )
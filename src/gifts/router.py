@@ -1,20 +1,42 @@
 from typing import Annotated
 from bson.objectid import ObjectId
-from fastapi import APIRouter, Body, Depends, Response, status
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorGridOut
 from starlette.status import HTTP_200_OK
 
 from src.gifts.schemas import (
     Gift,
     GiftAdminResponse,
+    GiftCategoryCount,
     GiftCreationRequest,
+    GiftFilter,
+    GiftImageSize,
     GiftResponse,
     GiftUpdateRequest,
     VerifyReceiptRequest,
     VerifyReceiptResponse,
 )
+from src.bulk import NDJSON_REQUEST_BODY, BulkImportResponse
 from src.mongo import path_param_object_id
+from src.responses import (
+    FastJSONResponse,
+    etag_headers,
+    etag_matches,
+    is_conditional,
+    not_modified_response,
+    parse_etags,
+)
+from src.pagination import (
+    ListFormat,
+    Page,
+    ndjson_response,
+    query_param_page,
+    set_next_page_header,
+)
 
-from src.gifts import service as gifts_service
+from src.gifts import images, service as gifts_service
+from src.gifts.dependencies import query_param_gift_filter
 from src.users.dependencies import get_current_user, get_required_admin_user
 from src.users.schemas import User
 
@@ -22,19 +44,75 @@ from src.users.schemas import User
 router = APIRouter(prefix="/gifts", tags=["Gifts"])
 
 
-@router.get("/", status_code=HTTP_200_OK)
+@router.get(
+    "/",
+    status_code=HTTP_200_OK,
+    response_model=list[GiftResponse | GiftAdminResponse],
+    response_class=FastJSONResponse,
+)
 async def fetch_all_gifts(
+    request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
-) -> list[GiftResponse | GiftAdminResponse]:
-    return await gifts_service.find_all_gifts(current_user)
+    page: Annotated[Page, Depends(query_param_page)],
+    gift_filter: Annotated[GiftFilter, Depends(query_param_gift_filter)],
+    format: ListFormat = ListFormat.json,
+):
+    if format == ListFormat.ndjson:
+        return ndjson_response(gifts_service.iterate_gifts(current_user, page, gift_filter))
+
+    if is_conditional(request):
+        etag = await gifts_service.find_gifts_etag(current_user, page, gift_filter)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+    gifts = await gifts_service.find_all_gifts(current_user, page, gift_filter)
+
+    response = FastJSONResponse(
+        gifts, headers=etag_headers(gifts_service.gifts_etag(current_user, gifts))
+    )
+    set_next_page_header(response, page, gifts)
+
+    return response
+
+
+@router.get(
+    "/export",
+    status_code=HTTP_200_OK,
+    response_class=StreamingResponse,
+    dependencies=[Depends(get_required_admin_user)],
+)
+async def export_gifts():
+    return ndjson_response(gifts_service.export_gifts())
+
 
+@router.get("/categories", status_code=HTTP_200_OK, dependencies=[Depends(get_current_user)])
+async def fetch_gift_categories(
+    gift_filter: Annotated[GiftFilter, Depends(query_param_gift_filter)],
+) -> list[GiftCategoryCount]:
+    return await gifts_service.find_gift_categories(gift_filter)
 
-@router.get("/{id}", status_code=HTTP_200_OK)
+
+@router.get(
+    "/{id}",
+    status_code=HTTP_200_OK,
+    response_model=GiftResponse | GiftAdminResponse,
+    response_class=FastJSONResponse,
+)
 async def find_gift(
+    request: Request,
     id: Annotated[ObjectId, Depends(path_param_object_id)],
     current_user: Annotated[User, Depends(get_current_user)],
-) -> GiftResponse | GiftAdminResponse:
-    return await gifts_service.find_gift_by_id(current_user, id)
+):
+    if is_conditional(request):
+        etag = await gifts_service.find_gift_etag(current_user, id)
+        if etag is not None and etag_matches(request, etag):
+            return not_modified_response(etag)
+
+    gift = await gifts_service.find_gift_by_id(current_user, id)
+
+    return FastJSONResponse(
+        gift, headers=etag_headers(gifts_service.gifts_etag(current_user, [gift]))
+    )
 
 
 @router.post(
@@ -46,6 +124,16 @@ async def create_gift(create_request: GiftCreationRequest) -> Gift:
     return await gifts_service.create_gift(create_request)
 
 
+@router.post(
+    "/import",
+    status_code=HTTP_200_OK,
+    dependencies=[Depends(get_required_admin_user)],
+    openapi_extra=NDJSON_REQUEST_BODY,
+)
+async def import_gifts(request: Request) -> BulkImportResponse:
+    return await gifts_service.import_gifts(request.stream())
+
+
 @router.patch(
     "/{id}",
     status_code=HTTP_200_OK,
@@ -86,21 +174,117 @@ async def verify_quiz_completion(
 async def upload_gift_image(
     id: Annotated[ObjectId, Depends(path_param_object_id)],
     gift_image_binary: Annotated[bytes, Body(media_type="image/*")],
+    background_tasks: BackgroundTasks,
 ):
-    await gifts_service.upload_gift_image(id, gift_image_binary)
+    image_id = await gifts_service.upload_gift_image(id, gift_image_binary)
+
+    background_tasks.add_task(gifts_service.generate_gift_image_variants, id, image_id)
 
 
 @router.get(
     "/{id}/image",
     status_code=HTTP_200_OK,
-    dependencies=[Depends(get_required_admin_user)],
+    dependencies=[Depends(get_current_user)],
 )
 async def fetch_gift_image(
     id: Annotated[ObjectId, Depends(path_param_object_id)],
+    request: Request,
+    size: GiftImageSize | None = None,
 ) -> Response:
-    image_binary = await gifts_service.fetch_gift_image(id)
+    grid_out = await gifts_service.fetch_gift_image(id, size)
+
+    return _build_image_response(request, grid_out)
+
+
+def _build_image_response(request: Request, grid_out: AsyncIOMotorGridOut) -> Response:
+    etag = images.image_etag(grid_out)
+    length = grid_out.length
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=0"}
+
+    if_none_match = parse_etags(request.headers.get("if-none-match"))
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range", etag)
+    # Other range units are ignored, as is a Range conditioned on a stale If-Range
+    if range_header and range_header.startswith("bytes=") and if_range == etag:
+        parsed_range = _parse_byte_range(range_header)
+
+        # An invalid Range is ignored, only a valid one that misses the image gets a 416
+        if parsed_range is not None:
+            byte_range = _satisfiable_byte_range(parsed_range, length)
+
+            if byte_range is None:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={**headers, "Content-Range": f"bytes */{length}"},
+                )
+
+    status_code = HTTP_200_OK
+    start, end = 0, length - 1
+    if byte_range is not None:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+
+    headers["Content-Length"] = str(end - start + 1)
 
-    return Response(
-        content=image_binary,
-        media_type="image/*",
+    return StreamingResponse(
+        _read_image_range(grid_out, start, end),
+        status_code=status_code,
+        media_type=images.image_content_type(grid_out),
+        headers=headers,
     )
+
+
+async def _read_image_range(grid_out: AsyncIOMotorGridOut, start: int, end: int):
+    grid_out.seek(start)
+    remaining = end - start + 1
+
+    while remaining > 0:
+        chunk = await grid_out.read(min(remaining, grid_out.chunk_size))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _parse_byte_range(header: str) -> tuple[int | None, int | None] | None:
+    """Parses the first range of a `bytes=` header into its first and last byte positions.
+
+    Returns None when the range is syntactically invalid. A suffix range has no first
+    position, an open range no last one. Multiple ranges are answered with the first one.
+    """
+    first, dash, last = header.removeprefix("bytes=").split(",")[0].strip().partition("-")
+
+    if not dash or not (first or last):
+        return None
+    if any(part and not (part.isascii() and part.isdigit()) for part in (first, last)):
+        return None
+
+    if not first:
+        return None, int(last)
+    if last and int(last) < int(first):
+        return None
+
+    return int(first), int(last) if last else None
+
+
+def _satisfiable_byte_range(
+    byte_range: tuple[int | None, int | None], length: int
+) -> tuple[int, int] | None:
+    """Clamps a parsed range to the image, returns None when the two do not overlap."""
+    first, last = byte_range
+
+    if first is None:
+        # A suffix range asks for the last `last` bytes
+        if not last or length == 0:
+            return None
+        return max(length - last, 0), length - 1
+
+    if first >= length:
+        return None
+
+    return first, length - 1 if last is None else min(last, length - 1)
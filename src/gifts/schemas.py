@@ -1,8 +1,54 @@
-from pydantic import BaseModel, Field
+from enum import Enum
+
+from pydantic import BaseModel, ConfigDict, Field
+from pymongo import ASCENDING, IndexModel
 
 from src.mongo import ModelObjectId
 
 
+class GiftImageSize(str, Enum):
+    small = "small"
+    medium = "medium"
+    large = "large"
+
+
+class GiftSort(str, Enum):
+    id = "id"
+    price_asc = "price_asc"
+    price_desc = "price_desc"
+
+
+class GiftFilter(BaseModel):
+    """Catalog filters, with "affordable" already resolved into `max_price`."""
+
+    model_config = ConfigDict(frozen=True)
+
+    category: str | None = None
+    min_price: int | None = None
+    max_price: int | None = None
+    sort: GiftSort = GiftSort.id
+
+    def price_query(self) -> dict:
+        price_points = {}
+        if self.min_price is not None:
+            price_points["$gte"] = self.min_price
+        if self.max_price is not None:
+            price_points["$lte"] = self.max_price
+
+        return {"price_points": price_points} if price_points else {}
+
+    def query(self) -> dict:
+        query = self.price_query()
+        if self.category is not None:
+            query["category"] = self.category
+        return query
+
+
+class GiftCategoryCount(BaseModel):
+    category: str
+    count: int
+
+
 class VerifiedReceipt(BaseModel):
     receiver_id: ModelObjectId
     receipt_timestamp: float
@@ -34,6 +80,8 @@ class GiftResponse(BaseModel):
     price_points: int
     category: str
     verified_receipt: bool
+    # Only feeds the ETag, never serialized
+    revision: int = Field(0, exclude=True)
 
 
 class GiftAdminResponse(BaseModel):
@@ -42,6 +90,8 @@ class GiftAdminResponse(BaseModel):
     price_points: int
     category: str
     verified_receipts: list[VerifiedReceipt] = []
+    # Only feeds the ETag, never serialized
+    revision: int = Field(0, exclude=True)
 
 
 class VerifyReceiptRequest(BaseModel):
@@ -51,3 +101,18 @@ class VerifyReceiptRequest(BaseModel):
 class VerifyReceiptResponse(BaseModel):
     receiver_id: ModelObjectId
     receipt_timestamp: float
+
+
+# Documents without a revision predate it and count as revision 0
+REVISION_INDEX = [("_id", ASCENDING), ("revision", ASCENDING)]
+# Serves category and price filters, sorting by price with _id breaking ties, and category facets
+CATALOG_INDEX = [("category", ASCENDING), ("price_points", ASCENDING), ("_id", ASCENDING)]
+
+indexes = {
+    "gifts": [
+        IndexModel([("verified_receipts.receiver_id", ASCENDING)]),
+        # Answers ETag checks from the index alone
+        IndexModel(REVISION_INDEX),
+        IndexModel(CATALOG_INDEX),
+    ],
+}
@@ -1,76 +1,411 @@
+import asyncio
+import logging
 import time
+from typing import AsyncIterator
+
 from bson.objectid import ObjectId
-from pymongo import ReturnDocument
-from src import gifts, mongo
-from src.gifts.exceptions import GiftAlreadyReceived, GiftNotFound, NotEnoughPoints
+from motor.motor_asyncio import AsyncIOMotorGridOut
+from motor.core import AgnosticCursor
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from src import invalidation, mongo
+from src.bulk import BulkImportResponse, import_ndjson
+from src.cache import TTLCache
+from src.config import settings
+from src.gifts import images
+from src.leaderboard import service as leaderboard_service
+from src.pagination import Page, iterate_batches
+from src.responses import entity_tag
+from src.gifts.exceptions import (
+    GiftAlreadyReceived,
+    GiftImageNotFound,
+    GiftNotFound,
+    GiftPageStartNotFound,
+    NotEnoughPoints,
+    UnsupportedGiftImage,
+)
 from src.gifts.schemas import (
+    CATALOG_INDEX,
+    REVISION_INDEX,
     Gift,
     GiftAdminResponse,
+    GiftCategoryCount,
     GiftCreationRequest,
+    GiftFilter,
+    GiftImageSize,
     GiftResponse,
+    GiftSort,
     GiftUpdateRequest,
     VerifiedReceipt,
     VerifyReceiptRequest,
     VerifyReceiptResponse,
 )
 from src.users.exceptions import UserNotFound
-from src.users.schemas import PersistedUser, User, UserRole
+from src.users.schemas import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+GIFT_BATCH_SIZE = 100
+GIFTS_TOPIC = "gifts"
+
+_gifts_cache: TTLCache[tuple, list[GiftResponse | GiftAdminResponse]] = TTLCache(
+    "gifts", lambda: settings.catalog_cache_max_entries, lambda: settings.catalog_cache_ttl
+)
+_categories_cache: TTLCache[tuple, list[GiftCategoryCount]] = TTLCache(
+    "gift_categories",
+    lambda: settings.catalog_cache_max_entries,
+    lambda: settings.catalog_cache_ttl,
+)
+
+
+async def iterate_gifts(
+    current_user: User, page: Page = Page(), gift_filter: GiftFilter = GiftFilter()
+) -> AsyncIterator[GiftResponse | GiftAdminResponse]:
+    """Streams gifts straight from the catalog cursor, only whole pages go through the cache."""
+    cursor = await _find_catalog(gift_filter, page, _gift_projection(current_user.role))
 
+    async for batch in iterate_batches(cursor, GIFT_BATCH_SIZE):
+        gifts = [_build_cached_gift(current_user.role, gift_dict) for gift_dict in batch]
 
-async def find_all_gifts(current_user: User) -> list[GiftResponse | GiftAdminResponse]:
-    gift_dicts = await mongo.gifts_collection.find({}).to_list(None)
+        for gift in await _apply_receipts(current_user, gifts):
+            yield gift
 
-    return list(map(lambda gift_dict: _build_gift_response(current_user, gift_dict), gift_dicts))
+
+async def find_all_gifts(
+    current_user: User, page: Page = Page(), gift_filter: GiftFilter = GiftFilter()
+) -> list[GiftResponse | GiftAdminResponse]:
+    gifts = await _find_cached_gifts(current_user.role, page, gift_filter)
+    gift_responses = []
+
+    for batch_start in range(0, len(gifts), GIFT_BATCH_SIZE):
+        batch = gifts[batch_start : batch_start + GIFT_BATCH_SIZE]
+        gift_responses.extend(await _apply_receipts(current_user, batch))
+
+    return gift_responses
+
+
+async def _apply_receipts(
+    current_user: User, gifts: list[GiftResponse | GiftAdminResponse]
+) -> list[GiftResponse | GiftAdminResponse]:
+    received_gift_ids = await _find_received_gift_ids(current_user, [gift.id for gift in gifts])
+
+    return [
+        _build_gift_response(current_user, gift, gift.id in received_gift_ids) for gift in gifts
+    ]
 
 
 async def find_gift_by_id(current_user: User, id: ObjectId) -> GiftResponse | GiftAdminResponse:
-    gift_dict = await mongo.gifts_collection.find_one({"_id": id})
+    cache_key = (current_user.role, id)
+    gifts = _gifts_cache.get(cache_key)
+
+    if gifts is None:
+        generation = _gifts_cache.generation
+        gift_dict = await mongo.gifts_collection.find_one(
+            {"_id": id}, _gift_projection(current_user.role)
+        )
+
+        if gift_dict is None:
+            raise GiftNotFound
+
+        gifts = [_build_cached_gift(current_user.role, gift_dict)]
+        _gifts_cache.set(cache_key, gifts, generation=generation)
+
+    received_gift_ids = await _find_received_gift_ids(current_user, [id])
+
+    return _build_gift_response(current_user, gifts[0], id in received_gift_ids)
+
+
+async def find_gifts_etag(
+    current_user: User, page: Page = Page(), gift_filter: GiftFilter = GiftFilter()
+) -> str:
+    """Computes the ETag of a page of gifts, from the revision index alone when unfiltered."""
+    cursor = await _find_catalog(gift_filter, page, {"revision": True})
+    if gift_filter == GiftFilter():
+        cursor = cursor.hint(REVISION_INDEX)
+
+    revisions = [(gift_dict["_id"], gift_dict.get("revision") or 0) async for gift_dict in cursor]
+
+    return _revisions_etag(current_user, revisions)
+
+
+async def find_gift_etag(current_user: User, id: ObjectId) -> str | None:
+    gift_dict = await mongo.gifts_collection.find_one(
+        {"_id": id}, {"revision": True}, hint=REVISION_INDEX
+    )
 
     if gift_dict is None:
-        raise GiftNotFound
+        return None
+
+    return _revisions_etag(current_user, [(id, gift_dict.get("revision") or 0)])
+
+
+def gifts_etag(current_user: User, gifts: list[GiftResponse | GiftAdminResponse]) -> str:
+    """Computes the ETag of gifts about to be served, cached copies may lag behind Mongo."""
+    return _revisions_etag(current_user, [(gift.id, gift.revision) for gift in gifts])
+
 
-    return _build_gift_response(current_user, gift_dict)
+def _revisions_etag(current_user: User, revisions: list[tuple[ObjectId, int]]) -> str:
+    # Admins all get the same body, users get their own verified_receipt
+    viewer = current_user.id if current_user.role != UserRole.admin else None
 
+    return entity_tag(GIFTS_TOPIC, current_user.role, viewer, revisions)
 
-def _build_gift_response(current_user: User, gift_dict: dict) -> GiftResponse | GiftAdminResponse:
+
+async def find_gift_categories(gift_filter: GiftFilter = GiftFilter()) -> list[GiftCategoryCount]:
+    """Counts gifts per category within the price filter.
+
+    The category filter itself is ignored, so every category stays selectable.
+    """
+    cache_key = (gift_filter.min_price, gift_filter.max_price)
+    categories = _categories_cache.get(cache_key)
+
+    if categories is None:
+        generation = _categories_cache.generation
+        pipeline = [
+            {"$match": gift_filter.price_query()},
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]
+        # Hinted, as no filter on the category prefix would make the planner pick the index,
+        # scanning it answers the counts without loading documents
+        cursor = mongo.gifts_catalog_collection.aggregate(pipeline, hint=CATALOG_INDEX)
+        categories = [
+            GiftCategoryCount(category=category_dict["_id"], count=category_dict["count"])
+            async for category_dict in cursor
+        ]
+        _categories_cache.set(cache_key, categories, generation=generation)
+
+    return categories
+
+
+async def _find_cached_gifts(
+    role: UserRole, page: Page, gift_filter: GiftFilter
+) -> list[GiftResponse | GiftAdminResponse]:
+    cache_key = (role, page.after, page.limit, gift_filter)
+    gifts = _gifts_cache.get(cache_key)
+
+    if gifts is None:
+        # An eviction while the page loads means it may predate a write, it is served once
+        # but not cached
+        generation = _gifts_cache.generation
+        cursor = await _find_catalog(gift_filter, page, _gift_projection(role))
+        gifts = [_build_cached_gift(role, gift_dict) async for gift_dict in cursor]
+        _gifts_cache.set(cache_key, gifts, generation=generation)
+
+    return gifts
+
+
+async def _find_catalog(gift_filter: GiftFilter, page: Page, projection: dict) -> AgnosticCursor:
+    query = gift_filter.query()
+
+    if gift_filter.sort == GiftSort.id:
+        return page.apply(mongo.gifts_catalog_collection.find(page.filter(query), projection))
+
+    direction, after_operator = ASCENDING, "$gt"
+    if gift_filter.sort == GiftSort.price_desc:
+        direction, after_operator = DESCENDING, "$lt"
+
+    if page.after is not None:
+        # Pages sorted by price continue after the (price_points, _id) of the last gift
+        after_dict = await mongo.gifts_catalog_collection.find_one(
+            {"_id": page.after}, {"price_points": True}
+        )
+
+        if after_dict is None:
+            raise GiftPageStartNotFound
+
+        after_price = after_dict["price_points"]
+        query = {
+            "$and": [
+                query,
+                {
+                    "$or": [
+                        {"price_points": {after_operator: after_price}},
+                        {"price_points": after_price, "_id": {after_operator: page.after}},
+                    ]
+                },
+            ]
+        }
+
+    cursor = mongo.gifts_catalog_collection.find(query, projection).sort(
+        [("price_points", direction), ("_id", direction)]
+    )
+    if page.limit is not None:
+        cursor = cursor.limit(page.limit)
+
+    return cursor
+
+
+def invalidate_gifts_cache():
+    _gifts_cache.clear()
+    _categories_cache.clear()
+
+
+invalidation.subscribe(GIFTS_TOPIC, invalidate_gifts_cache)
+
+
+def _gift_projection(role: UserRole) -> dict:
+    if role == UserRole.admin:
+        return {"image": False, "image_id": False, "image_variants": False}
+
+    return {"name": True, "price_points": True, "category": True, "revision": True}
+
+
+def received_gifts_query(current_user: User, gift_ids: list[ObjectId]) -> dict:
+    # Served by the verified_receipts.receiver_id index
+    return {"_id": {"$in": gift_ids}, "verified_receipts.receiver_id": current_user.id}
+
+
+async def _find_received_gift_ids(current_user: User, gift_ids: list[ObjectId]) -> set[ObjectId]:
     if current_user.role == UserRole.admin:
+        return set()
+
+    cursor = mongo.gifts_collection.find(
+        received_gifts_query(current_user, gift_ids), {"_id": True}
+    )
+
+    return {gift_dict["_id"] async for gift_dict in cursor}
+
+
+def _build_cached_gift(role: UserRole, gift_dict: dict) -> GiftResponse | GiftAdminResponse:
+    if role == UserRole.admin:
         return GiftAdminResponse(**gift_dict)
     else:
-        gift = Gift(**gift_dict)
-        verified_receipt = any(
-            current_user.id == receipt.user_id for receipt in gift.verified_receipts
-        )
-        return GiftResponse(verified_receipt=verified_receipt, **gift_dict)
+        return GiftResponse(verified_receipt=False, **gift_dict)
+
+
+def _build_gift_response(
+    current_user: User, gift: GiftResponse | GiftAdminResponse, verified_receipt: bool
+) -> GiftResponse | GiftAdminResponse:
+    # Cached gifts are shared between requests, only ever hand out updated copies
+    if current_user.role == UserRole.admin:
+        return gift.model_copy()
+    else:
+        return gift.model_copy(update={"verified_receipt": verified_receipt})
 
 
 async def create_gift(creation_request: GiftCreationRequest) -> Gift:
     creation_request_dict = creation_request.model_dump()
+    creation_request_dict["revision"] = 1
     insert_result = await mongo.gifts_collection.insert_one(creation_request_dict)
 
+    await invalidation.publish(GIFTS_TOPIC)
+
     creation_request_dict["_id"] = insert_result.inserted_id
     return Gift(**creation_request_dict)
 
 
-async def upload_gift_image(id: ObjectId, gift_image_binary: bytes):
-    await mongo.gifts_collection.update_one({"_id": id}, {"$set": {"image": gift_image_binary}})
+async def import_gifts(chunks: AsyncIterator[bytes]) -> BulkImportResponse:
+    import_response = await import_ndjson(
+        chunks,
+        GiftCreationRequest,
+        lambda creation_request: {**creation_request.model_dump(), "revision": 1},
+        lambda gift_dicts: mongo.gifts_collection.insert_many(gift_dicts, ordered=False),
+    )
+
+    await invalidation.publish(GIFTS_TOPIC)
+
+    return import_response
+
+
+async def export_gifts() -> AsyncIterator[Gift]:
+    cursor = mongo.gifts_collection.find(
+        {}, {"image": False, "image_id": False, "image_variants": False}
+    ).sort("_id", 1)
+
+    async for gift_dict in cursor:
+        yield Gift(**gift_dict)
+
+
+async def upload_gift_image(id: ObjectId, gift_image_binary: bytes) -> ObjectId:
+    content_type = images.detect_content_type(gift_image_binary)
+
+    if content_type is None:
+        raise UnsupportedGiftImage
+
+    gift_dict = await mongo.gifts_collection.find_one(
+        {"_id": id}, {"image_id": True, "image_variants": True}
+    )
+
+    if gift_dict is None:
+        raise GiftNotFound
+
+    image_id = await images.store_gift_image(id, gift_image_binary, content_type)
+    await mongo.gifts_collection.update_one(
+        {"_id": id}, {"$set": {"image_id": image_id}, "$unset": {"image_variants": ""}}
+    )
+
+    await _delete_gift_images(gift_dict)
+
+    return image_id
+
+
+async def generate_gift_image_variants(id: ObjectId, image_id: ObjectId):
+    """Stores downscaled variants of a freshly uploaded image, run after the upload response."""
+    grid_out = await images.open_gift_image(image_id)
+    binary = await grid_out.read()
+
+    try:
+        rendered_variants = await asyncio.to_thread(images.render_variants, binary)
+    except ValueError:
+        logger.warning("Image %s of gift %s cannot be decoded, skipping variants", image_id, id)
+        return
+
+    variants = {}
+    for size, variant_binary in rendered_variants.items():
+        variants[size.value] = await images.store_gift_image(
+            id, variant_binary, images.VARIANT_CONTENT_TYPE, size
+        )
+
+    # The image may have been replaced or removed while the variants were rendered
+    update_result = await mongo.gifts_collection.update_one(
+        {"_id": id, "image_id": image_id}, {"$set": {"image_variants": variants}}
+    )
+
+    if update_result.matched_count == 0:
+        await _delete_gift_images({"image_variants": variants})
 
 
-async def fetch_gift_image(id: ObjectId) -> bytes:
-    gift_dict = await mongo.gifts_collection.find_one({"_id": id}, {"image": True})
+async def fetch_gift_image(id: ObjectId, size: GiftImageSize | None = None) -> AsyncIOMotorGridOut:
+    gift_dict = await mongo.gifts_collection.find_one(
+        {"_id": id}, {"image_id": True, "image_variants": True}
+    )
 
     if gift_dict is None:
         raise GiftNotFound
 
-    return gift_dict["image"]
+    if "image_id" not in gift_dict:
+        raise GiftImageNotFound
+
+    # Images narrower than the requested size, or whose variants are still being
+    # rendered, are served as the original
+    variants = gift_dict.get("image_variants", {})
+    if size is not None and size.value in variants:
+        return await images.open_gift_image(variants[size.value])
+
+    return await images.open_gift_image(gift_dict["image_id"])
+
+
+async def _delete_gift_images(gift_dict: dict):
+    image_ids = list(gift_dict.get("image_variants", {}).values())
+    if "image_id" in gift_dict:
+        image_ids.append(gift_dict["image_id"])
+
+    for image_id in image_ids:
+        await images.delete_gift_image(image_id)
 
 
 async def update_gift_by_id(id: ObjectId, update: GiftUpdateRequest) -> Gift:
     update_dict = update.model_dump(exclude_unset=True)
 
     updated_gift_dict = await mongo.gifts_collection.find_one_and_update(
-        {"_id": id}, {"$set": update_dict}, return_document=ReturnDocument.AFTER
+        {"_id": id},
+        {"$set": update_dict, "$inc": {"revision": 1}},
+        projection={"image": False, "image_id": False, "image_variants": False},
+        return_document=ReturnDocument.AFTER,
     )
 
+    await invalidation.publish(GIFTS_TOPIC)
+
     if updated_gift_dict is None:
         raise GiftNotFound
 
@@ -78,45 +413,75 @@ async def update_gift_by_id(id: ObjectId, update: GiftUpdateRequest) -> Gift:
 
 
 async def delete_gift_by_id(id: ObjectId):
-    delete_result = await mongo.gifts_collection.delete_one({"_id": id})
+    gift_dict = await mongo.gifts_collection.find_one_and_delete(
+        {"_id": id}, projection={"image_id": True, "image_variants": True}
+    )
+    await invalidation.publish(GIFTS_TOPIC)
 
-    if delete_result.deleted_count == 0:
+    if gift_dict is None:
         raise GiftNotFound
 
+    await _delete_gift_images(gift_dict)
+
 
 async def verify_gift_receipt(
     gift_id: ObjectId, verify_receipt: VerifyReceiptRequest
 ) -> VerifyReceiptResponse:
-    receiver_id = verify_receipt.receiver_id
+    receipt = VerifiedReceipt(
+        receiver_id=verify_receipt.receiver_id,
+        receipt_timestamp=time.time(),
+    )
+    receipt_dict = receipt.model_dump()
 
-    gift_dict = await mongo.gifts_collection.find_one({"_id": gift_id})
-    if gift_dict is None:
-        raise GiftNotFound
-    gift = Gift(**gift_dict)
+    if mongo.supports_transactions:
+        async with await mongo.client.start_session() as session:
+            await session.with_transaction(
+                lambda session: _redeem_gift(gift_id, receipt_dict, session)
+            )
+    else:
+        await _redeem_gift(gift_id, receipt_dict)
 
-    if any(receiver_id == receipt.receiver_id for receipt in gift.verified_receipts):
-        raise GiftAlreadyReceived
+    # Admin views of the catalog list the receipts
+    await invalidation.publish(GIFTS_TOPIC)
+    leaderboard_service.invalidate_leaderboard_cache()
 
-    user_dict = await mongo.users_collection.find_one({"_id": receiver_id})
-    if user_dict is None:
-        raise UserNotFound
-    user = PersistedUser(**user_dict)
+    return VerifyReceiptResponse(**receipt_dict)
 
-    if user.points < gift.price_points:
-        raise NotEnoughPoints
 
-    receipt = VerifiedReceipt(
-        receiver_id=receiver_id,
-        receipt_timestamp=time.time(),
-    )
-    receipt_dict = receipt.model_dump()
+async def _redeem_gift(gift_id: ObjectId, receipt_dict: dict, session=None):
+    receiver_id = receipt_dict["receiver_id"]
 
-    await mongo.users_collection.update_one(
-        {"_id": user.id}, {"$inc": {"points": -gift.price_points}}
+    # Pushing only if the receiver has no receipt yet makes duplicate redemptions lose here
+    gift_dict = await mongo.gifts_collection.find_one_and_update(
+        {"_id": gift_id, "verified_receipts.receiver_id": {"$ne": receiver_id}},
+        {"$push": {"verified_receipts": receipt_dict}, "$inc": {"revision": 1}},
+        projection={"price_points": True},
+        session=session,
     )
 
-    await mongo.gifts_collection.update_one(
-        {"_id": gift_id}, {"$push": {"verified_receipts": receipt_dict}}
+    if gift_dict is None:
+        if await mongo.gifts_collection.count_documents({"_id": gift_id}, limit=1, session=session):
+            raise GiftAlreadyReceived
+        raise GiftNotFound
+
+    price_points = gift_dict["price_points"]
+
+    update_result = await mongo.users_collection.update_one(
+        {"_id": receiver_id, "points": {"$gte": price_points}},
+        {"$inc": {"points": -price_points}},
+        session=session,
     )
 
-    return VerifyReceiptResponse(**receipt_dict)
+    if update_result.matched_count == 0:
+        if session is None:
+            # No transaction to abort, so take the receipt back by hand
+            await mongo.gifts_collection.update_one(
+                {"_id": gift_id},
+                {"$pull": {"verified_receipts": receipt_dict}, "$inc": {"revision": 1}},
+            )
+
+        if await mongo.users_collection.count_documents(
+            {"_id": receiver_id}, limit=1, session=session
+        ):
+            raise NotEnoughPoints
+        raise UserNotFound
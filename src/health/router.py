@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Response
+from starlette.status import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
+
+from src.health import service as health_service
+from src.health.schemas import Liveness, Readiness
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live", status_code=HTTP_200_OK)
+async def check_liveness() -> Liveness:
+    return health_service.check_liveness()
+
+
+@router.get("/ready", status_code=HTTP_200_OK)
+async def check_readiness(response: Response) -> Readiness:
+    readiness = await health_service.check_readiness()
+
+    if not readiness.ready:
+        response.status_code = HTTP_503_SERVICE_UNAVAILABLE
+
+    return readiness
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, computed_field
+
+
+class ServerHealth(BaseModel):
+    address: str
+    server_type: str
+    heartbeat_round_trip_ms: float | None
+    connections: int
+    checked_out_connections: int
+    max_pool_size: int
+
+    @computed_field
+    @property
+    def pool_saturation(self) -> float:
+        return self.checked_out_connections / self.max_pool_size
+
+
+class Liveness(BaseModel):
+    alive: bool
+    servers: list[ServerHealth]
+
+
+class Readiness(BaseModel):
+    ready: bool
+    ping_round_trip_ms: float | None
+    servers: list[ServerHealth]
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from pymongo.errors import PyMongoError
+
+from src import mongo
+from src.config import settings
+from src.health.schemas import Liveness, Readiness, ServerHealth
+
+
+def find_server_health() -> list[ServerHealth]:
+    """Reports what the driver already knows, without talking to the servers."""
+    servers = []
+
+    for (
+        host,
+        port,
+    ), description in mongo.client.topology_description.server_descriptions().items():
+        address = f"{host}:{port}"
+        round_trip_time = description.round_trip_time
+
+        servers.append(
+            ServerHealth(
+                address=address,
+                server_type=description.server_type_name,
+                heartbeat_round_trip_ms=(
+                    round_trip_time * 1000 if round_trip_time is not None else None
+                ),
+                connections=mongo.pool_metrics.connections[address],
+                checked_out_connections=mongo.pool_metrics.checked_out[address],
+                max_pool_size=settings.mongo_max_pool_size,
+            )
+        )
+
+    return servers
+
+
+def check_liveness() -> Liveness:
+    # Deliberately independent of Mongo, an unreachable database is not fixed by a restart
+    return Liveness(alive=True, servers=find_server_health())
+
+
+async def check_readiness() -> Readiness:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            mongo.database.command("ping"), timeout=settings.health_check_timeout
+        )
+    except (PyMongoError, asyncio.TimeoutError):
+        return Readiness(ready=False, ping_round_trip_ms=None, servers=find_server_health())
+
+    return Readiness(
+        ready=True,
+        ping_round_trip_ms=(time.perf_counter() - started) * 1000,
+        servers=find_server_health(),
+    )
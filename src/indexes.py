@@ -0,0 +1,80 @@
+import logging
+from contextlib import asynccontextmanager
+
+from motor.core import AgnosticCollection
+from pymongo import IndexModel
+
+from src import mongo
+from src.gifts.schemas import indexes as gifts_indexes
+from src.mail.schemas import indexes as mail_indexes
+from src.quizes.schemas import indexes as quizes_indexes
+from src.throttling import indexes as throttling_indexes
+from src.users.schemas import indexes as users_indexes
+
+logger = logging.getLogger(__name__)
+
+registry: dict[str, list[IndexModel]] = {
+    **users_indexes,
+    **quizes_indexes,
+    **gifts_indexes,
+    **mail_indexes,
+    **throttling_indexes,
+}
+
+
+@asynccontextmanager
+async def lifespan(_):
+    created = await apply_indexes()
+
+    for collection_name, index_names in created.items():
+        logger.info("Created indexes on '%s': %s", collection_name, ", ".join(index_names))
+
+    yield
+
+
+async def apply_indexes() -> dict[str, list[str]]:
+    """Creates every registered index that does not exist yet.
+
+    Returns the names of the newly created indexes per collection.
+    """
+    created: dict[str, list[str]] = {}
+
+    for collection_name, index_models in registry.items():
+        collection = mongo.database.get_collection(collection_name)
+        existing = set(await collection.index_information())
+
+        index_names = await collection.create_indexes(index_models)
+
+        new_index_names = [name for name in index_names if name not in existing]
+        if new_index_names:
+            created[collection_name] = new_index_names
+
+    return created
+
+
+async def explain_winning_plan(collection: AgnosticCollection, filter: dict, **kwargs) -> dict:
+    explanation = await collection.find(filter, **kwargs).explain()
+
+    return explanation["queryPlanner"]["winningPlan"]
+
+
+def plan_stages(plan: dict):
+    yield plan["stage"]
+
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+
+    for input_plan in plan.get("inputStages", []):
+        yield from plan_stages(input_plan)
+
+
+async def assert_uses_index(collection: AgnosticCollection, filter: dict, **kwargs):
+    """Fails when the query planner answers `filter` with a collection scan."""
+    winning_plan = await explain_winning_plan(collection, filter, **kwargs)
+    stages = list(plan_stages(winning_plan))
+
+    if "COLLSCAN" in stages:
+        raise AssertionError(
+            f"Query {filter!r} on '{collection.name}' does not use an index: {stages}"
+        )
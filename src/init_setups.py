@@ -1,22 +1,37 @@
+import logging
+import time
 from contextlib import asynccontextmanager
 
-from src import mongo
+from src import locks
 from src.config import settings
+from src.gifts import migrations as gifts_migrations
+from src.quizes import migrations as quizes_migrations
 from src.users import service as users_service
 from src.users.schemas import UserDetails, UserRole
 
+logger = logging.getLogger(__name__)
+
 
 @asynccontextmanager
 async def lifespan(_):
-    print("Init setups")
+    started = time.perf_counter()
 
-    if not await mongo.users_collection.find_one({"email": settings.root_user_email}):
+    # Workers booting together take turns, the first one does the work and the
+    # others find everything already in place
+    async with locks.hold("init_setups", settings.startup_lock_lease):
         root_user_details = UserDetails(
             email=settings.root_user_email,
             full_name=settings.root_user_full_name,
             password=settings.root_user_password,
         )
 
-        await users_service.create_user_using_details(root_user_details, role=UserRole.admin)
+        if await users_service.ensure_user_using_details(root_user_details, role=UserRole.admin):
+            logger.info("Created root user '%s'", settings.root_user_email)
+
+        await quizes_migrations.move_embedded_completions()
+        await gifts_migrations.move_embedded_images()
+        await gifts_migrations.normalize_receipt_receiver_ids()
+
+    logger.info("Init setups took %.3fs", time.perf_counter() - started)
 
     yield
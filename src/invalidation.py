@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timezone
+from typing import Callable
+
+from pymongo.errors import PyMongoError
+
+from src import mongo
+from src.config import settings
+from src.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+_handlers: defaultdict[str, list[Callable[[], None]]] = defaultdict(list)
+
+
+def subscribe(topic: str, handler: Callable[[], None]):
+    """Registers `handler` to evict local caches whenever any worker publishes `topic`."""
+    _handlers[topic].append(handler)
+
+
+async def publish(topic: str):
+    """Evicts the local caches of `topic` right away and tells the other workers to follow.
+
+    Each topic is one version document, bumped on every publish. The other workers
+    see the bump through a change stream or by polling.
+    """
+    _evict(topic, "local")
+
+    await mongo.cache_versions_collection.update_one(
+        {"_id": topic},
+        {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+    )
+
+
+@asynccontextmanager
+async def lifespan(_):
+    mode = settings.cache_invalidation_mode
+    if mode == "auto":
+        # Change streams need a replica set or a sharded cluster, like transactions
+        mode = "change_stream" if mongo.supports_transactions else "poll"
+
+    listener = None
+    if mode == "change_stream":
+        listener = asyncio.create_task(_run_listener(_watch_versions))
+    elif mode == "poll":
+        listener = asyncio.create_task(_run_listener(_poll_versions))
+
+    yield
+
+    if listener is not None:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+
+
+def _evict(topic: str, source: str, updated_at: datetime | None = None):
+    for handler in _handlers.get(topic, []):
+        handler()
+
+    metrics.cache_invalidations_total.labels(topic, source).inc()
+
+    if updated_at is not None:
+        # pymongo hands back naive UTC datetimes
+        lag = datetime.now(timezone.utc) - updated_at.replace(tzinfo=timezone.utc)
+        metrics.cache_invalidation_lag_seconds.labels(topic).observe(max(lag.total_seconds(), 0.0))
+
+
+def _evict_all(source: str):
+    for topic in list(_handlers):
+        _evict(topic, source)
+
+
+async def _run_listener(listen: Callable):
+    while True:
+        try:
+            await listen()
+        except PyMongoError as error:
+            logger.warning("Cache invalidation listener failed, restarting: %s", error)
+
+        await asyncio.sleep(settings.cache_invalidation_poll_interval)
+
+
+async def _watch_versions():
+    async with mongo.cache_versions_collection.watch() as change_stream:
+        # Anything published while the stream was down is unknown, start clean
+        _evict_all("change_stream")
+
+        async for change in change_stream:
+            topic = change["documentKey"]["_id"]
+            document = change.get("fullDocument") or change.get("updateDescription", {}).get(
+                "updatedFields", {}
+            )
+
+            _evict(topic, "change_stream", document.get("updated_at"))
+
+
+async def _poll_versions():
+    versions = {
+        version_dict["_id"]: version_dict["version"]
+        async for version_dict in mongo.cache_versions_collection.find()
+    }
+    _evict_all("poll")
+
+    while True:
+        await asyncio.sleep(settings.cache_invalidation_poll_interval)
+
+        async for version_dict in mongo.cache_versions_collection.find():
+            topic = version_dict["_id"]
+
+            if versions.get(topic) != version_dict["version"]:
+                versions[topic] = version_dict["version"]
+                _evict(topic, "poll", version_dict["updated_at"])
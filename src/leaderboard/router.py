@@ -0,0 +1,27 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from starlette.status import HTTP_200_OK
+
+from src.leaderboard import service as leaderboard_service
+from src.leaderboard.schemas import LeaderboardEntry
+from src.users.dependencies import get_current_user
+from src.users.schemas import User
+
+MAX_LEADERBOARD_LIMIT = 100
+
+router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
+
+
+@router.get("/", status_code=HTTP_200_OK, dependencies=[Depends(get_current_user)])
+async def fetch_leaderboard(
+    limit: Annotated[int, Query(ge=1, le=MAX_LEADERBOARD_LIMIT)] = 10,
+) -> list[LeaderboardEntry]:
+    return await leaderboard_service.find_top_users(limit)
+
+
+@router.get("/me", status_code=HTTP_200_OK)
+async def fetch_current_user_rank(
+    current_user: Annotated[User, Depends(get_current_user)],
+) -> LeaderboardEntry:
+    return await leaderboard_service.find_user_rank(current_user.id)
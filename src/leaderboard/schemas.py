@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+from src.mongo import ModelObjectId
+
+
+class LeaderboardEntry(BaseModel):
+    id: ModelObjectId = Field(alias="_id")
+    full_name: str
+    points: int = 0
+    rank: int
@@ -0,0 +1,82 @@
+from bson import ObjectId
+
+from src import invalidation, mongo
+from src.cache import TTLCache
+from src.config import settings
+from src.leaderboard.schemas import LeaderboardEntry
+from src.users import service as users_service
+from src.users.exceptions import UserNotFound
+
+_leaderboard_cache: TTLCache[tuple, list[LeaderboardEntry]] = TTLCache(
+    "leaderboard",
+    lambda: settings.leaderboard_cache_max_entries,
+    lambda: settings.leaderboard_cache_ttl,
+)
+
+_ENTRY_PROJECTION = {"full_name": True, "points": True}
+
+
+def users_ahead_query(points: int) -> dict:
+    # Served by the (points desc, _id) index
+    return {"points": {"$gt": points}}
+
+
+async def find_top_users(limit: int) -> list[LeaderboardEntry]:
+    cache_key = ("top", limit)
+    entries = _leaderboard_cache.get(cache_key)
+
+    if entries is None:
+        generation = _leaderboard_cache.generation
+        # Served by the (points desc, _id) index, ties are listed in sign-up order
+        cursor = (
+            mongo.users_collection.find({}, _ENTRY_PROJECTION)
+            .sort([("points", -1), ("_id", 1)])
+            .limit(limit)
+        )
+
+        entries = []
+        async for user_dict in cursor:
+            # Users created before points existed have none stored and count as 0
+            user_dict.setdefault("points", 0)
+
+            # Users with equal points share a rank, the next rank skips accordingly
+            if entries and entries[-1].points == user_dict["points"]:
+                rank = entries[-1].rank
+            else:
+                rank = len(entries) + 1
+            entries.append(LeaderboardEntry(rank=rank, **user_dict))
+
+        _leaderboard_cache.set(cache_key, entries, generation=generation)
+
+    return entries
+
+
+async def find_user_rank(user_id: ObjectId) -> LeaderboardEntry:
+    cache_key = ("rank", user_id)
+    entries = _leaderboard_cache.get(cache_key)
+
+    if entries is None:
+        generation = _leaderboard_cache.generation
+        user_dict = await mongo.users_collection.find_one({"_id": user_id}, _ENTRY_PROJECTION)
+
+        if user_dict is None:
+            raise UserNotFound
+
+        # An indexed count of everyone strictly ahead, no scan of the user base
+        users_ahead = await mongo.users_collection.count_documents(
+            users_ahead_query(user_dict.get("points", 0))
+        )
+
+        entries = [LeaderboardEntry(rank=users_ahead + 1, **user_dict)]
+        _leaderboard_cache.set(cache_key, entries, generation=generation)
+
+    return entries[0]
+
+
+def invalidate_leaderboard_cache():
+    _leaderboard_cache.clear()
+
+
+# Points from completions and redemptions only invalidate locally and rely on the
+# short TTL, publishing them would turn every completion into a write on one hot document
+invalidation.subscribe(users_service.USERS_TOPIC, invalidate_leaderboard_cache)
@@ -0,0 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from src import mongo
+
+
+@asynccontextmanager
+async def hold(name: str, lease: float, poll_interval: float = 0.5):
+    """Holds a lock shared by every process using the database.
+
+    The lock expires after `lease` seconds, so a crashed holder cannot block the
+    others for longer than that.
+    """
+    holder = ObjectId()
+
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            # Either takes over an expired lock or inserts a new one, a live lock
+            # makes the upsert collide on _id
+            await mongo.locks_collection.update_one(
+                {"_id": name, "expires_at": {"$lt": now}},
+                {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=lease)}},
+                upsert=True,
+            )
+            break
+        except DuplicateKeyError:
+            await asyncio.sleep(poll_interval)
+
+    try:
+        yield
+    finally:
+        await mongo.locks_collection.delete_one({"_id": name, "holder": holder})
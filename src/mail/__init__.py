@@ -0,0 +1,30 @@
+from pathlib import Path
+from fastapi_mail import ConnectionConfig, FastMail
+
+from src.config import settings
+
+_client: FastMail | None = None
+
+
+def get_client() -> FastMail:
+    """Builds the client on first use, so importing needs no mail settings."""
+    global _client
+
+    if _client is None:
+        _client = FastMail(
+            ConnectionConfig(
+                MAIL_USERNAME=settings.mail_username,
+                MAIL_PASSWORD=settings.mail_password,
+                MAIL_FROM=settings.mail_from,
+                MAIL_PORT=settings.mail_port,
+                MAIL_SERVER=settings.mail_server,
+                MAIL_FROM_NAME=settings.mail_from_name,
+                MAIL_STARTTLS=settings.mail_starttls,
+                MAIL_SSL_TLS=settings.mail_ssl_tls,
+                USE_CREDENTIALS=settings.use_credentials,
+                VALIDATE_CERTS=settings.validate_certs,
+                TEMPLATE_FOLDER=Path(settings.mail_template_folder),
+            )
+        )
+
+    return _client
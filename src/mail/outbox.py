@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import formataddr
+
+from bson import ObjectId
+from fastapi_mail import MessageSchema
+from fastapi_mail.connection import Connection
+
+from src import mongo
+from src.config import settings
+from src.mail import get_client
+from src.monitoring import metrics
+from .schemas import OutboxMessage, OutboxStats, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+_wakeup: asyncio.Event | None = None
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global _wakeup
+
+    _wakeup = asyncio.Event()
+    sender = asyncio.create_task(_run_sender(_wakeup))
+
+    yield
+
+    sender.cancel()
+    with suppress(asyncio.CancelledError):
+        await sender
+    _wakeup = None
+
+
+async def enqueue_message(message: MessageSchema, template_name: str | None = None):
+    """Stores the message for the background sender, no SMTP work happens here."""
+    if template_name is not None:
+        template = get_client().config.template_engine().get_template(template_name)
+        html = template.render(**(message.template_body or {}))
+    else:
+        html = str(message.body or "")
+
+    now = datetime.now(timezone.utc)
+    outbox_message = OutboxMessage(
+        _id=ObjectId(),
+        recipients=[str(recipient) for recipient in message.recipients],
+        subject=message.subject,
+        html=html,
+        created_at=now,
+        next_attempt_at=now,
+    )
+
+    await mongo.mail_outbox_collection.insert_one(outbox_message.model_dump(by_alias=True))
+
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def fetch_outbox_stats() -> OutboxStats:
+    counts = {status: 0 for status in OutboxStatus}
+    async for group in mongo.mail_outbox_collection.aggregate(
+        [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    ):
+        counts[OutboxStatus(group["_id"])] = group["count"]
+
+    oldest_pending = await mongo.mail_outbox_collection.find_one(
+        {"status": OutboxStatus.pending.value},
+        {"created_at": True},
+        sort=[("next_attempt_at", 1)],
+    )
+
+    oldest_pending_age = None
+    if oldest_pending is not None:
+        created_at = oldest_pending["created_at"].replace(tzinfo=timezone.utc)
+        oldest_pending_age = (datetime.now(timezone.utc) - created_at).total_seconds()
+
+    return OutboxStats(
+        pending=counts[OutboxStatus.pending],
+        sending=counts[OutboxStatus.sending],
+        sent=counts[OutboxStatus.sent],
+        failed=counts[OutboxStatus.failed],
+        oldest_pending_age=oldest_pending_age,
+    )
+
+
+async def _run_sender(wakeup: asyncio.Event):
+    while True:
+        try:
+            await _drain()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Mail outbox sender failed, retrying on the next poll")
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(wakeup.wait(), timeout=settings.mail_outbox_poll_interval)
+        wakeup.clear()
+
+
+async def _drain():
+    batch = await _claim_batch()
+
+    while batch:
+        # One SMTP session is reused for as long as the outbox keeps yielding batches
+        try:
+            async with Connection(get_client().config) as connection:
+                while batch:
+                    for outbox_message in batch:
+                        await _send(connection, outbox_message)
+
+                    batch = await _claim_batch()
+        except Exception as error:
+            logger.warning("SMTP session failed: %s", error)
+            for outbox_message in batch:
+                await _schedule_retry(outbox_message, str(error))
+            return
+
+
+async def _claim_batch() -> list[OutboxMessage]:
+    """Leases up to a batch of due messages, safe to run from several workers at once."""
+    now = datetime.now(timezone.utc)
+    due_query = {
+        "$or": [
+            {"status": OutboxStatus.pending.value, "next_attempt_at": {"$lte": now}},
+            {"status": OutboxStatus.sending.value, "locked_until": {"$lte": now}},
+        ]
+    }
+
+    due_ids = [
+        message_dict["_id"]
+        async for message_dict in mongo.mail_outbox_collection.find(
+            due_query, {"_id": True}, limit=settings.mail_outbox_batch_size
+        )
+    ]
+    if not due_ids:
+        return []
+
+    claim_id = ObjectId()
+    await mongo.mail_outbox_collection.update_many(
+        {"_id": {"$in": due_ids}, **due_query},
+        {
+            "$set": {
+                "status": OutboxStatus.sending.value,
+                "claim_id": claim_id,
+                "locked_until": now + timedelta(seconds=settings.mail_outbox_lease),
+            }
+        },
+    )
+
+    return [
+        OutboxMessage(**message_dict)
+        async for message_dict in mongo.mail_outbox_collection.find({"claim_id": claim_id})
+    ]
+
+
+async def _send(connection: Connection, outbox_message: OutboxMessage):
+    email_message = EmailMessage()
+    email_message["Subject"] = outbox_message.subject
+    mail_config = get_client().config
+    email_message["From"] = formataddr((mail_config.MAIL_FROM_NAME, mail_config.MAIL_FROM))
+    email_message["To"] = ", ".join(outbox_message.recipients)
+    email_message.set_content(outbox_message.html, subtype="html")
+
+    started = time.perf_counter()
+    try:
+        await connection.session.send_message(email_message)
+    except Exception as error:
+        metrics.mail_send_duration_seconds.labels("failed").observe(time.perf_counter() - started)
+        # Connection level failures end the session, the rest of the batch is retried
+        if not connection.session.is_connected:
+            raise
+        await _schedule_retry(outbox_message, str(error))
+        return
+
+    metrics.mail_send_duration_seconds.labels("sent").observe(time.perf_counter() - started)
+    await mongo.mail_outbox_collection.update_one(
+        {"_id": outbox_message.id, "claim_id": outbox_message.claim_id},
+        {
+            "$set": {"status": OutboxStatus.sent.value, "sent_at": datetime.now(timezone.utc)},
+            "$unset": {"claim_id": "", "locked_until": ""},
+        },
+    )
+
+
+async def _schedule_retry(outbox_message: OutboxMessage, error: str):
+    attempts = outbox_message.attempts + 1
+    delay = min(
+        settings.mail_outbox_retry_base_delay * 2 ** (attempts - 1),
+        settings.mail_outbox_retry_max_delay,
+    )
+
+    status = OutboxStatus.pending
+    if attempts >= settings.mail_outbox_max_attempts:
+        status = OutboxStatus.failed
+        logger.error("Giving up on mail %s: %s", outbox_message.id, error)
+
+    await mongo.mail_outbox_collection.update_one(
+        {"_id": outbox_message.id, "claim_id": outbox_message.claim_id},
+        {
+            "$set": {
+                "status": status.value,
+                "attempts": attempts,
+                "next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                "last_error": error,
+            },
+            "$unset": {"claim_id": "", "locked_until": ""},
+        },
+    )
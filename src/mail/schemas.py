@@ -0,0 +1,48 @@
+from datetime import datetime
+from enum import Enum
+
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
+
+from src.mongo import ModelObjectId
+
+SENT_MESSAGES_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+
+class OutboxStatus(str, Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+
+class OutboxMessage(BaseModel):
+    id: ModelObjectId = Field(alias="_id")
+    recipients: list[str]
+    subject: str
+    html: str
+    status: OutboxStatus = OutboxStatus.pending
+    attempts: int = 0
+    created_at: datetime
+    next_attempt_at: datetime
+    locked_until: datetime | None = None
+    claim_id: ModelObjectId | None = None
+    sent_at: datetime | None = None
+    last_error: str | None = None
+
+
+class OutboxStats(BaseModel):
+    pending: int
+    sending: int
+    sent: int
+    failed: int
+    oldest_pending_age: float | None
+
+
+indexes = {
+    "mail_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel([("claim_id", ASCENDING)], sparse=True),
+        IndexModel([("sent_at", ASCENDING)], expireAfterSeconds=SENT_MESSAGES_RETENTION_SECONDS),
+    ],
+}
@@ -1,43 +1,89 @@
-from contextlib import asynccontextmanager
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src import mongo, init_setups
+from src import config, mongo, indexes, init_setups, invalidation, throttling
+from src.config import Settings
+from src.mail import outbox
+from src.users import hashing
 
 from .tokens.router import router as tokens_router
 from .users.router import router as users_router
 from .quizes.router import router as quizes_router
 from .gifts.router import router as gifts_router
+from .leaderboard.router import router as leaderboard_router
+from .health.router import router as health_router
+from .monitoring import metrics, slow_commands
+from .monitoring.metrics import MetricsMiddleware
+from .monitoring.router import router as monitoring_router, metrics_router
+
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def app_lifespan(ctx: FastAPI):
-    lifespans = [
-        mongo.lifespan(ctx),
-        init_setups.lifespan(ctx),
+    lifespan_modules = [
+        mongo,
+        slow_commands,
+        indexes,
+        hashing,
+        throttling,
+        invalidation,
+        outbox,
+        init_setups,
     ]
 
-    for lifespan in lifespans:
-        await lifespan.__aenter__()
+    # Exited in reverse, so the outbox and the listeners stop before the Mongo client closes,
+    # a failing startup still exits the lifespans already entered
+    async with AsyncExitStack() as lifespans:
+        started = time.perf_counter()
+        for module in lifespan_modules:
+            lifespan_started = time.perf_counter()
+
+            await lifespans.enter_async_context(module.lifespan(ctx))
+
+            elapsed = time.perf_counter() - lifespan_started
+            metrics.startup_duration_seconds.labels(module.__name__).set(elapsed)
+
+        logger.info("Started in %.3fs", time.perf_counter() - started)
+
+        yield
+
+
+def create_app(app_settings: Settings | None = None) -> FastAPI:
+    """Builds the application, nothing is configured or connected until its lifespan starts.
+
+    Serve with `uvicorn --factory src.main:create_app`, or through the module level `app`.
+    """
+    if app_settings is not None:
+        config.configure(app_settings)
 
-    yield
+    app = FastAPI(lifespan=app_lifespan)
 
-    for lifespan in lifespans:
-        await lifespan.__aexit__(None, None, None)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(slow_commands.CallerTrackingMiddleware)
 
+    app.include_router(tokens_router)
+    app.include_router(users_router)
+    app.include_router(quizes_router)
+    app.include_router(gifts_router)
+    app.include_router(leaderboard_router)
+    app.include_router(monitoring_router)
+    app.include_router(health_router)
+    app.include_router(metrics_router)
 
-app = FastAPI(lifespan=app_lifespan)
+    return app
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(tokens_router)
-app.include_router(users_router)
-app.include_router(quizes_router)
-app.include_router(gifts_router)
+app = create_app()
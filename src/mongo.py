@@ -4,7 +4,8 @@ from contextlib import asynccontextmanager
 from bson import ObjectId
 from fastapi import Depends, HTTPException, Path
 from motor.core import AgnosticClient, AgnosticCollection, AgnosticDatabase
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 from pydantic import (
     GetCoreSchemaHandler,
     GetJsonSchemaHandler,
@@ -13,38 +14,103 @@ from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema
 
 from .config import settings
+from .monitoring import metrics, slow_commands
 
 
+client: AgnosticClient
+database: AgnosticDatabase
+supports_transactions: bool
+pool_metrics: metrics.PoolMetrics
+
 users_collection: AgnosticCollection
 user_creation_requests_collection: AgnosticCollection
 quizes_collection: AgnosticCollection
+quiz_completions_collection: AgnosticCollection
 gifts_collection: AgnosticCollection
+gift_images_bucket: AsyncIOMotorGridFSBucket
+quizes_catalog_collection: AgnosticCollection
+gifts_catalog_collection: AgnosticCollection
+mail_outbox_collection: AgnosticCollection
+slow_commands_collection: AgnosticCollection
+locks_collection: AgnosticCollection
+throttle_buckets_collection: AgnosticCollection
+cache_versions_collection: AgnosticCollection
 
 
 @asynccontextmanager
 async def lifespan(_):
+    global client
+    global database
+    global supports_transactions
+    global pool_metrics
     global users_collection
     global user_creation_requests_collection
     global quizes_collection
+    global quiz_completions_collection
     global gifts_collection
-
-    mongo_client: AgnosticClient = AsyncIOMotorClient(
+    global gift_images_bucket
+    global quizes_catalog_collection
+    global gifts_catalog_collection
+    global mail_outbox_collection
+    global slow_commands_collection
+    global locks_collection
+    global throttle_buckets_collection
+    global cache_versions_collection
+
+    pool_metrics = metrics.PoolMetrics()
+    client = AsyncIOMotorClient(
         host=settings.mongo_host,
         username=settings.mongo_username,
         password=settings.mongo_password,
+        maxPoolSize=settings.mongo_max_pool_size,
+        minPoolSize=settings.mongo_min_pool_size,
+        maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+        waitQueueTimeoutMS=settings.mongo_wait_queue_timeout_ms,
+        connectTimeoutMS=settings.mongo_connect_timeout_ms,
+        serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+        compressors=settings.mongo_compressors or [],
+        event_listeners=[
+            metrics.CommandMetrics(),
+            pool_metrics,
+            *slow_commands.listeners(),
+        ],
     )
 
-    database: AgnosticDatabase = mongo_client[settings.mongo_database]
-    await database.command("ping")
+    database = client[settings.mongo_database]
+    hello = await database.command("hello")
+
+    # Multi-document transactions need a replica set or a sharded cluster
+    supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
 
     users_collection = database.get_collection("users")
     user_creation_requests_collection = database.get_collection("user_creation_requests")
     quizes_collection = database.get_collection("quizes")
+    quiz_completions_collection = database.get_collection("quiz_completions")
     gifts_collection = database.get_collection("gifts")
 
+    # Catalog listings may be served by secondaries, everything else reads from the primary
+    catalog_read_preference = make_read_preference(
+        read_pref_mode_from_name(settings.mongo_catalog_read_preference),
+        None,
+        settings.mongo_catalog_max_staleness_seconds,
+    )
+    quizes_catalog_collection = quizes_collection.with_options(
+        read_preference=catalog_read_preference
+    )
+    gifts_catalog_collection = gifts_collection.with_options(
+        read_preference=catalog_read_preference
+    )
+
+    gift_images_bucket = AsyncIOMotorGridFSBucket(database, bucket_name="gift_images")
+    mail_outbox_collection = database.get_collection("mail_outbox")
+    locks_collection = database.get_collection("locks")
+    throttle_buckets_collection = database.get_collection("throttle_buckets")
+    cache_versions_collection = database.get_collection("cache_versions")
+    slow_commands_collection = database.get_collection(slow_commands.SLOW_COMMANDS_COLLECTION)
+
     yield
 
-    mongo_client.close()
+    client.close()
 
 
 class ObjectIdAnnotation:
@@ -72,7 +138,7 @@ class ObjectIdAnnotation:
                 ]
             ),
             serialization=core_schema.plain_serializer_function_ser_schema(
-                lambda instance: str(instance)
+                lambda instance: str(instance), when_used="json"
             ),
         )
 
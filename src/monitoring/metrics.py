@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import defaultdict
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ["method", "route", "status"],
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method", "route"],
+)
+
+mongo_command_duration_seconds = Histogram(
+    "mongo_command_duration_seconds",
+    "Round trip time of Mongo commands",
+    ["command", "collection", "outcome"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+mongo_pool_connections = Gauge(
+    "mongo_pool_connections",
+    "Open connections in the Mongo connection pool",
+    ["address"],
+)
+mongo_pool_checked_out_connections = Gauge(
+    "mongo_pool_checked_out_connections",
+    "Mongo connections currently checked out of the pool",
+    ["address"],
+)
+mongo_pool_checkout_duration_seconds = Histogram(
+    "mongo_pool_checkout_duration_seconds",
+    "Time spent waiting for a connection from the Mongo pool",
+    ["address"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+mongo_pool_checkout_failures_total = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Failed attempts to check a connection out of the Mongo pool",
+    ["address", "reason"],
+)
+
+password_hashing_duration_seconds = Histogram(
+    "password_hashing_duration_seconds",
+    "Time spent hashing and verifying passwords, queueing included",
+    ["operation"],
+)
+password_hashing_rejections_total = Counter(
+    "password_hashing_rejections_total",
+    "Password hashing jobs rejected because the pool was saturated",
+)
+
+startup_duration_seconds = Gauge(
+    "app_startup_duration_seconds",
+    "Time each lifespan took to start when the worker booted",
+    ["lifespan"],
+)
+
+throttle_checks_total = Counter(
+    "throttle_checks_total",
+    "Token bucket checks in front of password hashing endpoints",
+    ["bucket"],
+)
+throttle_rejections_total = Counter(
+    "throttle_rejections_total",
+    "Requests rejected by a token bucket before any password hashing",
+    ["bucket"],
+)
+
+cache_invalidations_total = Counter(
+    "cache_invalidations_total",
+    "Cache evictions by topic and by how the worker learned about them",
+    ["topic", "source"],
+)
+cache_invalidation_lag_seconds = Histogram(
+    "cache_invalidation_lag_seconds",
+    "Time from a publish on any worker until this worker evicted its caches",
+    ["topic"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+mail_send_duration_seconds = Histogram(
+    "mail_send_duration_seconds",
+    "Time spent handing a message to the SMTP server",
+    ["outcome"],
+)
+
+
+def _route_path(scope: Scope) -> str:
+    # Label by route template instead of raw path to keep the label set bounded
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = _route_path(scope)
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method, route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            http_request_duration_seconds.labels(method, route, str(status)).observe(elapsed)
+
+
+def _address(address: tuple[str, int]) -> str:
+    return f"{address[0]}:{address[1]}"
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends, labelled by command and collection."""
+
+    def __init__(self):
+        self._collections: dict[tuple[int, object], str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        target = event.command.get(event.command_name)
+        # getMore carries the cursor id in place of the collection name
+        collection = target if isinstance(target, str) else event.command.get("collection", "")
+        self._collections[(event.request_id, event.connection_id)] = str(collection)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._observe(event, "succeeded")
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._observe(event, "failed")
+
+    def _observe(
+        self, event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent, outcome: str
+    ):
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        mongo_command_duration_seconds.labels(event.command_name, collection, outcome).observe(
+            event.duration_micros / 1_000_000
+        )
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks open and checked out connections per server.
+
+    The counts are also kept here, so health checks can read them without going
+    through the exporter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections: defaultdict[str, int] = defaultdict(int)
+        self.checked_out: defaultdict[str, int] = defaultdict(int)
+
+    def _count(self, counts: defaultdict[str, int], gauge: Gauge, address: str, change: int):
+        with self._lock:
+            counts[address] += change
+        gauge.labels(address).inc(change)
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent):
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent):
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent):
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent):
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent):
+        self._count(self.connections, mongo_pool_connections, _address(event.address), 1)
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent):
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent):
+        self._count(self.connections, mongo_pool_connections, _address(event.address), -1)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent):
+        pass
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent):
+        mongo_pool_checkout_failures_total.labels(_address(event.address), event.reason).inc()
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent):
+        address = _address(event.address)
+        self._count(self.checked_out, mongo_pool_checked_out_connections, address, 1)
+        # Only reported by pymongo 4.7 and later
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            mongo_pool_checkout_duration_seconds.labels(address).observe(duration)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent):
+        self._count(
+            self.checked_out, mongo_pool_checked_out_connections, _address(event.address), -1
+        )
@@ -0,0 +1,50 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.status import HTTP_200_OK
+
+from src import cache
+from src.mail import outbox
+from src.mail.schemas import OutboxStats
+from src.monitoring import service as monitoring_service
+from src.monitoring.schemas import CacheStats, SlowCommand
+from src.users.dependencies import get_required_admin_user
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+metrics_router = APIRouter(tags=["Monitoring"])
+
+
+@metrics_router.get("/metrics", status_code=HTTP_200_OK, include_in_schema=False)
+async def fetch_metrics() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/caches", status_code=HTTP_200_OK, dependencies=[Depends(get_required_admin_user)])
+async def fetch_cache_stats() -> list[CacheStats]:
+    return [
+        CacheStats(
+            name=name,
+            entries=len(ttl_cache),
+            max_entries=ttl_cache.max_entries,
+            hits=ttl_cache.hits,
+            misses=ttl_cache.misses,
+        )
+        for name, ttl_cache in cache.caches.items()
+    ]
+
+
+@router.get(
+    "/mail-outbox", status_code=HTTP_200_OK, dependencies=[Depends(get_required_admin_user)]
+)
+async def fetch_mail_outbox_stats() -> OutboxStats:
+    return await outbox.fetch_outbox_stats()
+
+
+@router.get(
+    "/slow-commands", status_code=HTTP_200_OK, dependencies=[Depends(get_required_admin_user)]
+)
+async def fetch_slow_commands(
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> list[SlowCommand]:
+    return await monitoring_service.find_slow_commands(limit)
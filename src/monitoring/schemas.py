@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, Field, computed_field
+
+from src.mongo import ModelObjectId
+
+
+class CacheStats(BaseModel):
+    name: str
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SlowCommand(BaseModel):
+    id: ModelObjectId = Field(alias="_id")
+    command_name: str
+    database: str
+    collection: str | None
+    duration_ms: float
+    filter_shape: Any
+    caller: str | None
+    plan: dict | None
+    plan_stages: list[str] = []
+    recorded_at: datetime
@@ -0,0 +1,16 @@
+from src import mongo
+from src.indexes import plan_stages
+from src.monitoring.schemas import SlowCommand
+
+
+async def find_slow_commands(limit: int) -> list[SlowCommand]:
+    """Returns the most recently recorded slow commands first."""
+    slow_commands = mongo.slow_commands_collection.find().sort("$natural", -1).limit(limit)
+
+    return [
+        SlowCommand(
+            **slow_command,
+            plan_stages=list(plan_stages(slow_command["plan"])) if slow_command["plan"] else [],
+        )
+        async for slow_command in slow_commands
+    ]
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src import mongo
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+SLOW_COMMANDS_COLLECTION = "slow_commands"
+QUEUE_SIZE = 1000
+
+EXPLAINABLE_COMMANDS = {
+    "find",
+    "aggregate",
+    "count",
+    "distinct",
+    "findAndModify",
+    "update",
+    "delete",
+}
+# Session and transaction fields are rejected by explain
+UNEXPLAINABLE_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern"}
+
+_request_task: ContextVar[asyncio.Task | None] = ContextVar("request_task", default=None)
+
+recorder: "SlowCommandRecorder | None" = None
+
+
+class SlowCommandRecorder(monitoring.CommandListener):
+    """Queues every command slower than the threshold for explaining and recording.
+
+    The driver calls listeners from motor's executor threads, records are handed
+    over to the event loop that created the recorder.
+    """
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_micros = threshold_ms * 1000
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._commands: dict[tuple[int, Any], dict] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if (
+            event.command_name == "explain"
+            or _collection_name(event.command) == SLOW_COMMANDS_COLLECTION
+        ):
+            return
+
+        self._commands[(event.request_id, event.connection_id)] = event.command
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        command = self._commands.pop((event.request_id, event.connection_id), None)
+        if command is None or event.duration_micros < self.threshold_micros:
+            return
+
+        record = {
+            "command_name": event.command_name,
+            "database": command.get("$db", event.database_name),
+            "collection": _collection_name(command),
+            "duration_ms": event.duration_micros / 1000,
+            "filter_shape": _shape(_command_filter(event.command_name, command)),
+            "caller": _caller(),
+            "recorded_at": datetime.now(timezone.utc),
+        }
+        self.loop.call_soon_threadsafe(self._enqueue, record, command)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._commands.pop((event.request_id, event.connection_id), None)
+
+    def _enqueue(self, record: dict, command: dict):
+        # Recording is best effort, a burst of slow commands must not grow memory without bound
+        with suppress(asyncio.QueueFull):
+            self.queue.put_nowait({"record": record, "command": command})
+
+
+def listeners() -> list[monitoring.CommandListener]:
+    """Creates the recorder when a threshold is configured, for registration on the client."""
+    global recorder
+
+    if settings.slow_command_threshold_ms is None:
+        recorder = None
+        return []
+
+    recorder = SlowCommandRecorder(settings.slow_command_threshold_ms)
+    return [recorder]
+
+
+@asynccontextmanager
+async def lifespan(_):
+    if recorder is None:
+        yield
+        return
+
+    with suppress(CollectionInvalid):
+        await mongo.database.create_collection(
+            SLOW_COMMANDS_COLLECTION, capped=True, size=settings.slow_command_log_max_bytes
+        )
+
+    writer = asyncio.create_task(_run_writer(recorder))
+
+    yield
+
+    writer.cancel()
+    with suppress(asyncio.CancelledError):
+        await writer
+
+
+class CallerTrackingMiddleware:
+    """Remembers the request task so slow commands can be traced back to the calling function."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        token = _request_task.set(asyncio.current_task())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_task.reset(token)
+
+
+async def _run_writer(recorder: SlowCommandRecorder):
+    while True:
+        queued = await recorder.queue.get()
+        record = queued["record"]
+
+        try:
+            record["plan"] = await _explain(record["command_name"], queued["command"])
+        except Exception as error:
+            # A command that cannot be explained is still worth recording
+            logger.warning("Could not explain slow %s command: %s", record["command_name"], error)
+            record["plan"] = None
+
+        try:
+            await mongo.slow_commands_collection.insert_one(record)
+        except PyMongoError:
+            logger.exception("Could not record slow %s command", record["command_name"])
+
+
+async def _explain(command_name: str, command: dict) -> dict | None:
+    if command_name not in EXPLAINABLE_COMMANDS:
+        return None
+
+    explained = {
+        key: value
+        for key, value in command.items()
+        if not key.startswith("$") and key not in UNEXPLAINABLE_FIELDS
+    }
+    # Bulk writes are explained by their first statement only
+    for key in ("updates", "deletes"):
+        if key in explained:
+            explained[key] = explained[key][:1]
+
+    explanation = await mongo.database.command({"explain": explained, "verbosity": "queryPlanner"})
+
+    if "queryPlanner" in explanation:
+        return explanation["queryPlanner"]["winningPlan"]
+
+    # Aggregations that are not pushed down entirely report the plan of their first stage
+    for stage in explanation.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"]["winningPlan"]
+
+    return None
+
+
+def _collection_name(command: dict) -> str | None:
+    target = next(iter(command.values()), None)
+    # getMore carries the cursor id in place of the collection name
+    if not isinstance(target, str):
+        target = command.get("collection")
+
+    return target
+
+
+def _command_filter(command_name: str, command: dict) -> Any:
+    if command_name == "aggregate":
+        return command.get("pipeline")
+    if command_name in ("update", "delete"):
+        statements = command.get(f"{command_name}s") or [{}]
+        return statements[0].get("q")
+
+    return command.get("filter", command.get("query"))
+
+
+def _shape(value: Any) -> Any:
+    """Replaces the values of a filter with their type names, so no user data is recorded."""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = _shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+
+    return type(value).__name__
+
+
+def _caller() -> str | None:
+    task = _request_task.get()
+    if task is None:
+        return None
+
+    # The request task is suspended on the command, the innermost coroutine from
+    # this package in its await chain is the function that issued it
+    caller = None
+    coroutine = task.get_coro()
+    while (frame := getattr(coroutine, "cr_frame", None)) is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("src.") and module not in ("src.mongo", __name__):
+            code = frame.f_code
+            # co_qualname is Python 3.11+, 3.10 only has the bare function name
+            caller = f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        coroutine = coroutine.cr_await
+
+    return caller
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Annotated, AsyncIterable, AsyncIterator, Sequence, TypeVar
+
+from bson import ObjectId
+from fastapi import HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+MAX_PAGE_LIMIT = 1000
+NEXT_PAGE_HEADER = "X-Next-After"
+
+T = TypeVar("T")
+
+
+class ListFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+
+
+@dataclass
+class Page:
+    limit: int | None = None
+    after: ObjectId | None = None
+
+    def filter(self, query: dict | None = None) -> dict:
+        query = dict(query or {})
+        if self.after is not None:
+            query["_id"] = {"$gt": self.after}
+        return query
+
+    def apply(self, cursor):
+        cursor = cursor.sort("_id", 1)
+        if self.limit is not None:
+            cursor = cursor.limit(self.limit)
+        return cursor
+
+    def stages(self) -> list[dict]:
+        stages: list[dict] = [{"$sort": {"_id": 1}}]
+        if self.limit is not None:
+            stages.append({"$limit": self.limit})
+        return stages
+
+
+def query_param_page(
+    limit: Annotated[int | None, Query(ge=1, le=MAX_PAGE_LIMIT)] = None,
+    after: Annotated[str | None, Query()] = None,
+) -> Page:
+    if after is None:
+        return Page(limit=limit)
+
+    try:
+        return Page(limit=limit, after=ObjectId(after))
+    except Exception:
+        raise HTTPException(
+            status_code=400, detail="Provided 'after' query parameter is invalid BSON ObjectId"
+        )
+
+
+def set_next_page_header(response: Response, page: Page, items: Sequence[BaseModel]):
+    if page.limit is not None and len(items) == page.limit:
+        response.headers[NEXT_PAGE_HEADER] = str(getattr(items[-1], "id"))
+
+
+def ndjson_response(items: AsyncIterator[BaseModel]) -> StreamingResponse:
+    async def lines():
+        async for item in items:
+            yield item.model_dump_json(by_alias=True) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def iterate_batches(items: AsyncIterable[T], size: int) -> AsyncIterator[list[T]]:
+    """Groups a cursor into lists of up to `size` items, reading no further than the consumer."""
+    batch: list[T] = []
+
+    async for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
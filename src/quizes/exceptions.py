@@ -11,3 +11,12 @@ class QuizAlreadyCompleted(DetailedHTTPException):
     status_code = status.HTTP_400_BAD_REQUEST
     detail = "Quiz is already completed"
 
+
+class QuizPageStartNotFound(DetailedHTTPException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Quiz to continue the page after no longer exists or no longer matches"
+
+
+class TooManyAnswers(DetailedHTTPException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "More answers were provided than the quiz has questions"
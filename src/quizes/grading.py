@@ -0,0 +1,68 @@
+import operator
+from array import array
+from dataclasses import dataclass
+from typing import Sequence
+
+from .exceptions import TooManyAnswers
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """The part of a quiz needed for grading, one compact array slot per question."""
+
+    correct_answer_indexes: bytes | array
+    points_per_answer: int
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.correct_answer_indexes)
+
+
+@dataclass(frozen=True)
+class Grade:
+    correct_answers: int
+    earned_points: int
+
+
+def build_answer_key(quiz_dict: dict) -> AnswerKey:
+    """Builds the key from a quiz projected down to its correct answers and points."""
+    indexes = [question["correct_answer_index"] for question in quiz_dict["questions"]]
+
+    # A byte per question covers every realistic quiz, wider indexes fall back to an array
+    try:
+        correct_answer_indexes = bytes(indexes)
+    except ValueError:
+        correct_answer_indexes = array("q", indexes)
+
+    return AnswerKey(correct_answer_indexes, quiz_dict["points_per_answer"])
+
+
+def grade(answer_key: AnswerKey, answer_indexes: Sequence[int]) -> Grade:
+    if len(answer_indexes) > answer_key.total_questions:
+        raise TooManyAnswers
+
+    # map() walks both sequences in C, a missing answer simply counts as wrong
+    correct_answers = sum(map(operator.eq, answer_key.correct_answer_indexes, answer_indexes))
+
+    return Grade(correct_answers, correct_answers * answer_key.points_per_answer)
+
+
+def grade_many(answer_key: AnswerKey, submissions: Sequence[Sequence[int]]) -> list[Grade]:
+    """Scores a burst of submissions for the same quiz in one call.
+
+    Every submission is held to the same answer limit as `grade`, one too many fails the call.
+    """
+    correct_answer_indexes = answer_key.correct_answer_indexes
+    total_questions = answer_key.total_questions
+    points_per_answer = answer_key.points_per_answer
+
+    if any(len(answer_indexes) > total_questions for answer_indexes in submissions):
+        raise TooManyAnswers
+
+    return [
+        Grade(correct_answers, correct_answers * points_per_answer)
+        for correct_answers in (
+            sum(map(operator.eq, correct_answer_indexes, answer_indexes))
+            for answer_indexes in submissions
+        )
+    ]
@@ -0,0 +1,42 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from src import mongo
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+async def move_embedded_completions():
+    """Moves `verified_completions` embedded in quiz documents into their own collection.
+
+    Idempotent: completions that were already moved are skipped by the unique
+    (quiz_id, user_id) index, and the embedded array is only dropped afterwards.
+    """
+    cursor = mongo.quizes_collection.find(
+        {"verified_completions": {"$exists": True}}, {"verified_completions": True}
+    )
+
+    async for quiz_dict in cursor:
+        # Completions used to be stored with user_id as a hex string
+        completion_dicts = [
+            {
+                **completion_dict,
+                "quiz_id": quiz_dict["_id"],
+                "user_id": ObjectId(completion_dict["user_id"]),
+            }
+            for completion_dict in quiz_dict["verified_completions"]
+        ]
+
+        if completion_dicts:
+            try:
+                await mongo.quiz_completions_collection.insert_many(completion_dicts, ordered=False)
+            except BulkWriteError as error:
+                if any(
+                    write_error["code"] != DUPLICATE_KEY_ERROR_CODE
+                    for write_error in error.details["writeErrors"]
+                ):
+                    raise
+
+        await mongo.quizes_collection.update_one(
+            {"_id": quiz_dict["_id"]}, {"$unset": {"verified_completions": ""}}
+        )
@@ -1,9 +1,25 @@
 from typing import Annotated
 from bson.objectid import ObjectId
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 from starlette.status import HTTP_200_OK
 
+from src.bulk import NDJSON_REQUEST_BODY, BulkImportResponse
 from src.mongo import path_param_object_id
+from src.responses import (
+    FastJSONResponse,
+    etag_headers,
+    etag_matches,
+    is_conditional,
+    not_modified_response,
+)
+from src.pagination import (
+    ListFormat,
+    Page,
+    ndjson_response,
+    query_param_page,
+    set_next_page_header,
+)
 from src.users.schemas import User
 
 from .schemas import (
@@ -18,22 +34,105 @@ from src.quizes import service as quizes_service
 from src.users.dependencies import get_current_user, get_required_admin_user
 
 
+MAX_SEARCH_LENGTH = 200
+
 router = APIRouter(prefix="/quizes", tags=["Quizes"])
 
 
-@router.get("/", status_code=HTTP_200_OK)
+@router.get(
+    "/",
+    status_code=HTTP_200_OK,
+    response_model=list[QuizResponse | QuizAdminResponse],
+    response_class=FastJSONResponse,
+)
 async def fetch_all_quizes(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    page: Annotated[Page, Depends(query_param_page)],
+    format: ListFormat = ListFormat.json,
+):
+    if format == ListFormat.ndjson:
+        return ndjson_response(quizes_service.iterate_quizes(current_user, page))
+
+    etag = None
+    if is_conditional(request):
+        etag = await quizes_service.find_quizes_etag(current_user, page)
+        if etag_matches(request, etag):
+            return not_modified_response(etag)
+
+    quizes = await quizes_service.find_all_quizes(current_user, page)
+
+    # Completions bump revisions without evicting cached views, a view older than Mongo is
+    # reloaded so the ETag served with it is current
+    if etag is not None and quizes_service.quizes_etag(current_user, quizes) != etag:
+        quizes_service.evict_quizes_page(current_user, page)
+        quizes = await quizes_service.find_all_quizes(current_user, page)
+
+    response = FastJSONResponse(
+        quizes, headers=etag_headers(quizes_service.quizes_etag(current_user, quizes))
+    )
+    set_next_page_header(response, page, quizes)
+
+    return response
+
+
+@router.get(
+    "/export",
+    status_code=HTTP_200_OK,
+    response_class=StreamingResponse,
+    dependencies=[Depends(get_required_admin_user)],
+)
+async def export_quizes():
+    return ndjson_response(quizes_service.export_quizes())
+
+
+@router.get(
+    "/search",
+    status_code=HTTP_200_OK,
+    response_model=list[QuizResponse | QuizAdminResponse],
+    response_class=FastJSONResponse,
+)
+async def search_quizes(
     current_user: Annotated[User, Depends(get_current_user)],
-) -> list[QuizResponse | QuizAdminResponse]:
-    return await quizes_service.find_all_quizes(current_user)
+    page: Annotated[Page, Depends(query_param_page)],
+    q: Annotated[str, Query(min_length=1, max_length=MAX_SEARCH_LENGTH)],
+):
+    page = Page(limit=page.limit or quizes_service.SEARCH_PAGE_LIMIT, after=page.after)
+
+    quizes = await quizes_service.search_quizes(current_user, q, page)
 
+    response = FastJSONResponse(quizes)
+    set_next_page_header(response, page, quizes)
 
-@router.get("/{id}", status_code=HTTP_200_OK)
+    return response
+
+
+@router.get(
+    "/{id}",
+    status_code=HTTP_200_OK,
+    response_model=QuizResponse | QuizAdminResponse,
+    response_class=FastJSONResponse,
+)
 async def find_quiz(
+    request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
     id: Annotated[ObjectId, Depends(path_param_object_id)],
-) -> QuizResponse | QuizAdminResponse:
-    return await quizes_service.find_quiz_by_id(current_user, id)
+):
+    etag = None
+    if is_conditional(request):
+        etag = await quizes_service.find_quiz_etag(current_user, id)
+        if etag is not None and etag_matches(request, etag):
+            return not_modified_response(etag)
+
+    quiz = await quizes_service.find_quiz_by_id(current_user, id)
+
+    if etag is not None and quizes_service.quizes_etag(current_user, [quiz]) != etag:
+        quizes_service.evict_quiz(current_user, id)
+        quiz = await quizes_service.find_quiz_by_id(current_user, id)
+
+    return FastJSONResponse(
+        quiz, headers=etag_headers(quizes_service.quizes_etag(current_user, [quiz]))
+    )
 
 
 @router.post(
@@ -43,6 +142,16 @@ async def create_quiz(create_request: QuizCreationRequest) -> Quiz:
     return await quizes_service.create_quiz(create_request)
 
 
+@router.post(
+    "/import",
+    status_code=HTTP_200_OK,
+    dependencies=[Depends(get_required_admin_user)],
+    openapi_extra=NDJSON_REQUEST_BODY,
+)
+async def import_quizes(request: Request) -> BulkImportResponse:
+    return await quizes_service.import_quizes(request.stream())
+
+
 @router.patch("/{id}", status_code=HTTP_200_OK, dependencies=[Depends(get_required_admin_user)])
 async def update_quiz(
     id: Annotated[ObjectId, Depends(path_param_object_id)], update: QuizUpdateRequest
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from pymongo import ASCENDING, TEXT, IndexModel
 
 from src.mongo import ModelObjectId
 
@@ -22,13 +23,16 @@ class VerifiedCompletion(BaseModel):
     completed_timestamp: float
 
 
+class QuizCompletion(VerifiedCompletion):
+    quiz_id: ModelObjectId
+
+
 class Quiz(BaseModel):
     id: ModelObjectId = Field(alias="_id")
     title: str
     description: str | None = None
     questions: list[QuizQuestionWithAnswer]
     points_per_answer: int
-    verified_completions: list[VerifiedCompletion]
 
 
 class QuizResponse(BaseModel):
@@ -38,6 +42,8 @@ class QuizResponse(BaseModel):
     questions: list[QuizQuestion]
     points_per_answer: int
     verified_completion: bool
+    # Only feeds the ETag, never serialized
+    revision: int = Field(0, exclude=True)
 
 
 class QuizAdminResponse(BaseModel):
@@ -47,6 +53,8 @@ class QuizAdminResponse(BaseModel):
     questions: list[QuizQuestionWithAnswer]
     points_per_answer: int
     verified_completions: list[VerifiedCompletion]
+    # Only feeds the ETag, never serialized
+    revision: int = Field(0, exclude=True)
 
 
 class QuizCreationRequest(BaseModel):
@@ -71,3 +79,23 @@ class VerifyCompletionResponse(BaseModel):
     correct_answers: int
     total_questions: int
     earned_points: int
+
+
+# Documents without a revision predate it and count as revision 0
+REVISION_INDEX = [("_id", ASCENDING), ("revision", ASCENDING)]
+
+indexes = {
+    "quizes": [
+        # Answers ETag checks from the index alone
+        IndexModel(REVISION_INDEX),
+        # A collection has at most one text index, every searchable field goes in this one
+        IndexModel(
+            [("title", TEXT), ("description", TEXT), ("questions.tile", TEXT)],
+            weights={"title": 10, "description": 3, "questions.tile": 1},
+            name="quizes_text",
+        ),
+    ],
+    "quiz_completions": [
+        IndexModel([("quiz_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+    ],
+}
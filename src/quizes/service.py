@@ -1,11 +1,29 @@
 import time
+from collections import defaultdict
+from typing import AsyncIterator, Hashable
+
 from bson.objectid import ObjectId
+from motor.core import AgnosticCollection
 from pymongo import ReturnDocument
-from src import mongo
-from src.quizes.exceptions import QuizAlreadyCompleted, QuizNotFound
+from pymongo.errors import DuplicateKeyError
+from src import invalidation, mongo
+from src.bulk import BulkImportResponse, import_ndjson
+from src.cache import TTLCache
+from src.config import settings
+from src.leaderboard import service as leaderboard_service
+from src.pagination import Page, iterate_batches
+from src.quizes.exceptions import (
+    QuizAlreadyCompleted,
+    QuizNotFound,
+    QuizPageStartNotFound,
+)
+from src.quizes.grading import AnswerKey, build_answer_key, grade
+from src.responses import entity_tag
 from src.quizes.schemas import (
+    REVISION_INDEX,
     Quiz,
     QuizAdminResponse,
+    QuizCompletion,
     QuizCreationRequest,
     QuizResponse,
     QuizUpdateRequest,
@@ -16,49 +34,370 @@ from src.quizes.schemas import (
 from src.users.exceptions import UserNotFound
 from src.users.schemas import User, UserRole
 
+QUIZ_BATCH_SIZE = 100
+SEARCH_PAGE_LIMIT = 20
+QUIZES_TOPIC = "quizes"
+
+# Fields of a quiz shown to users, correct_answer_index excluded
+_QUIZ_VIEW_FIELDS = {
+    "title": True,
+    "description": True,
+    "questions.tile": True,
+    "questions.answer_options": True,
+    "points_per_answer": True,
+    "revision": True,
+}
+
+_quizes_cache: TTLCache[tuple, list[QuizResponse | QuizAdminResponse]] = TTLCache(
+    "quizes", lambda: settings.catalog_cache_max_entries, lambda: settings.catalog_cache_ttl
+)
+_answer_keys_cache: TTLCache[ObjectId, AnswerKey] = TTLCache(
+    "answer_keys",
+    lambda: settings.answer_key_cache_max_entries,
+    lambda: settings.answer_key_cache_ttl,
+)
+
+
+async def iterate_quizes(
+    current_user: User, page: Page = Page()
+) -> AsyncIterator[QuizResponse | QuizAdminResponse]:
+    """Streams quizes straight from the catalog cursor, only whole pages go through the cache."""
+    collection = mongo.quizes_catalog_collection
+
+    if current_user.role != UserRole.admin:
+        cursor = collection.aggregate(_quiz_views_pipeline(current_user, page.filter(), page))
+        async for quiz_dict in cursor:
+            yield QuizResponse(**quiz_dict)
+        return
 
-async def find_all_quizes(current_user: User) -> list[QuizResponse | QuizAdminResponse]:
-    quiz_dicts = await mongo.quizes_collection.find({}).to_list(None)
+    cursor = page.apply(collection.find(page.filter(), {"verified_completions": False}))
+    async for batch in iterate_batches(cursor, QUIZ_BATCH_SIZE):
+        quizes = [QuizAdminResponse(verified_completions=[], **quiz_dict) for quiz_dict in batch]
 
-    return list(map(lambda quiz_dict: _build_quiz_response(current_user, quiz_dict), quiz_dicts))
+        for quiz in await _apply_completions(current_user, quizes):
+            yield quiz
+
+
+async def find_all_quizes(
+    current_user: User, page: Page = Page()
+) -> list[QuizResponse | QuizAdminResponse]:
+    return await _find_quizes(
+        current_user,
+        (page.after, page.limit),
+        page.filter(),
+        mongo.quizes_catalog_collection,
+        page,
+    )
 
 
 async def find_quiz_by_id(current_user: User, id: ObjectId) -> QuizResponse | QuizAdminResponse:
-    quiz_dict = await mongo.quizes_collection.find_one({"_id": id})
+    quizes = await _find_quizes(current_user, id, {"_id": id}, mongo.quizes_collection)
 
-    if quiz_dict is None:
+    if not quizes:
         raise QuizNotFound
 
-    return _build_quiz_response(current_user, quiz_dict)
+    return quizes[0]
 
 
-def _build_quiz_response(current_user: User, quiz_dict: dict) -> QuizResponse | QuizAdminResponse:
-    if current_user.role == UserRole.admin:
-        return QuizAdminResponse(**quiz_dict)
+async def search_quizes(
+    current_user: User, text: str, page: Page = Page()
+) -> list[QuizResponse | QuizAdminResponse]:
+    """Finds quizes by the words of their title, description and questions, best matches first.
+
+    Pages continue after the (text score, _id) of the last quiz of the previous page.
+    """
+    cache_key = (current_user.role, "search", text, page.after, page.limit)
+    quizes = _quizes_cache.get(cache_key)
+
+    if quizes is None:
+        generation = _quizes_cache.generation
+        cursor = mongo.quizes_catalog_collection.aggregate(
+            await _search_pipeline(current_user.role, text, page)
+        )
+
+        if current_user.role == UserRole.admin:
+            quizes = [
+                QuizAdminResponse(verified_completions=[], **quiz_dict)
+                async for quiz_dict in cursor
+            ]
+        else:
+            quizes = [
+                QuizResponse(verified_completion=False, **quiz_dict) async for quiz_dict in cursor
+            ]
+        _quizes_cache.set(cache_key, quizes, generation=generation)
+
+    return await _apply_completions(current_user, quizes)
+
+
+async def _search_pipeline(role: UserRole, text: str, page: Page) -> list[dict]:
+    text_match = search_query(text)
+    pipeline: list[dict] = [
+        {"$match": text_match},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+
+    if page.after is not None:
+        after_dict = await mongo.quizes_catalog_collection.find_one(
+            {**text_match, "_id": page.after}, {"score": {"$meta": "textScore"}}
+        )
+
+        if after_dict is None:
+            raise QuizPageStartNotFound
+
+        after_score = after_dict["score"]
+        pipeline.append(
+            {
+                "$match": {
+                    "$or": [
+                        {"score": {"$lt": after_score}},
+                        {"score": after_score, "_id": {"$gt": page.after}},
+                    ]
+                }
+            }
+        )
+
+    pipeline.append({"$sort": {"score": -1, "_id": 1}})
+    if page.limit is not None:
+        pipeline.append({"$limit": page.limit})
+
+    if role == UserRole.admin:
+        pipeline.append({"$project": {"verified_completions": False, "score": False}})
     else:
-        quiz = Quiz(**quiz_dict)
-        verified_completion = any(
-            current_user.id == completion.user_id for completion in quiz.verified_completions
+        pipeline.append({"$project": _QUIZ_VIEW_FIELDS})
+
+    return pipeline
+
+
+async def find_quizes_etag(current_user: User, page: Page = Page()) -> str:
+    """Computes the ETag of a page of quizes from the revision index alone."""
+    cursor = page.apply(
+        mongo.quizes_catalog_collection.find(page.filter(), {"revision": True}).hint(REVISION_INDEX)
+    )
+    revisions = [(quiz_dict["_id"], quiz_dict.get("revision") or 0) async for quiz_dict in cursor]
+
+    return _revisions_etag(current_user, revisions)
+
+
+async def find_quiz_etag(current_user: User, id: ObjectId) -> str | None:
+    quiz_dict = await mongo.quizes_collection.find_one(
+        {"_id": id}, {"revision": True}, hint=REVISION_INDEX
+    )
+
+    if quiz_dict is None:
+        return None
+
+    return _revisions_etag(current_user, [(id, quiz_dict.get("revision") or 0)])
+
+
+def quizes_etag(current_user: User, quizes: list[QuizResponse | QuizAdminResponse]) -> str:
+    """Computes the ETag of quizes about to be served, cached copies may lag behind Mongo."""
+    return _revisions_etag(current_user, [(quiz.id, quiz.revision) for quiz in quizes])
+
+
+def evict_quizes_page(current_user: User, page: Page):
+    """Drops this worker's cached view of one page, once it is known to lag behind Mongo."""
+    _quizes_cache.pop((current_user.role, (page.after, page.limit)))
+
+
+def evict_quiz(current_user: User, id: ObjectId):
+    _quizes_cache.pop((current_user.role, id))
+
+
+def _revisions_etag(current_user: User, revisions: list[tuple[ObjectId, int]]) -> str:
+    # Admins all get the same body, users get their own verified_completion
+    viewer = current_user.id if current_user.role != UserRole.admin else None
+
+    return entity_tag(QUIZES_TOPIC, current_user.role, viewer, revisions)
+
+
+async def _find_quizes(
+    current_user: User,
+    cache_key: Hashable,
+    query: dict,
+    collection: AgnosticCollection,
+    page: Page | None = None,
+) -> list[QuizResponse | QuizAdminResponse]:
+    cache_key = (current_user.role, cache_key)
+    quizes = _quizes_cache.get(cache_key)
+
+    if quizes is not None:
+        return await _apply_completions(current_user, quizes)
+
+    # An eviction while the quizes load means they may predate a write, they are served
+    # once but not cached
+    generation = _quizes_cache.generation
+
+    if current_user.role == UserRole.admin:
+        cursor = collection.find(query, {"verified_completions": False})
+        if page is not None:
+            cursor = page.apply(cursor)
+
+        quizes = [
+            QuizAdminResponse(verified_completions=[], **quiz_dict) async for quiz_dict in cursor
+        ]
+        _quizes_cache.set(cache_key, quizes, generation=generation)
+
+        return await _apply_completions(current_user, quizes)
+
+    # On a miss the pipeline already answers verified_completion for this user,
+    # the cached copies get it reset and recomputed per request
+    cursor = collection.aggregate(_quiz_views_pipeline(current_user, query, page))
+    quizes = [QuizResponse(**quiz_dict) async for quiz_dict in cursor]
+    _quizes_cache.set(
+        cache_key,
+        [quiz.model_copy(update={"verified_completion": False}) for quiz in quizes],
+        generation=generation,
+    )
+
+    return quizes
+
+
+def _quiz_views_pipeline(current_user: User, query: dict, page: Page | None) -> list[dict]:
+    """Builds the student view of quizes inside Mongo.
+
+    Answer keys never leave the server and verified_completion is answered by an
+    indexed lookup of at most one completion per quiz.
+    """
+    pipeline: list[dict] = [{"$match": query}]
+    if page is not None:
+        pipeline.extend(page.stages())
+
+    pipeline.extend(
+        [
+            {
+                "$lookup": {
+                    "from": mongo.quiz_completions_collection.name,
+                    "localField": "_id",
+                    "foreignField": "quiz_id",
+                    "pipeline": [
+                        {"$match": {"user_id": current_user.id}},
+                        {"$limit": 1},
+                        {"$project": {"_id": True}},
+                    ],
+                    "as": "completion",
+                }
+            },
+            {
+                "$project": {
+                    **_QUIZ_VIEW_FIELDS,
+                    "verified_completion": {"$gt": [{"$size": "$completion"}, 0]},
+                }
+            },
+        ]
+    )
+
+    return pipeline
+
+
+async def _apply_completions(
+    current_user: User, quizes: list[QuizResponse | QuizAdminResponse]
+) -> list[QuizResponse | QuizAdminResponse]:
+    quiz_responses = []
+
+    for batch_start in range(0, len(quizes), QUIZ_BATCH_SIZE):
+        batch = quizes[batch_start : batch_start + QUIZ_BATCH_SIZE]
+        completions = await _find_completions(current_user, [quiz.id for quiz in batch])
+
+        quiz_responses.extend(
+            _build_quiz_response(current_user, quiz, completions[quiz.id]) for quiz in batch
         )
-        return QuizResponse(verified_completion=verified_completion, **quiz_dict)
+
+    return quiz_responses
+
+
+def invalidate_quizes_cache():
+    _quizes_cache.clear()
+    _answer_keys_cache.clear()
+
+
+invalidation.subscribe(QUIZES_TOPIC, invalidate_quizes_cache)
+
+
+def completions_query(current_user: User, quiz_ids: list[ObjectId]) -> dict:
+    """Admins see every completion, users only their own."""
+    if current_user.role == UserRole.admin:
+        return {"quiz_id": {"$in": quiz_ids}}
+
+    # Served by the unique (quiz_id, user_id) index
+    return {"quiz_id": {"$in": quiz_ids}, "user_id": current_user.id}
+
+
+def search_query(text: str) -> dict:
+    # Served by the weighted "quizes_text" index
+    return {"$text": {"$search": text}}
+
+
+async def _find_completions(
+    current_user: User, quiz_ids: list[ObjectId]
+) -> defaultdict[ObjectId, list[dict]]:
+    completions = defaultdict(list)
+
+    if current_user.role == UserRole.admin:
+        projection = {"_id": False}
+    else:
+        projection = {"_id": False, "quiz_id": True}
+
+    query = completions_query(current_user, quiz_ids)
+    async for completion_dict in mongo.quiz_completions_collection.find(query, projection):
+        completions[completion_dict["quiz_id"]].append(completion_dict)
+
+    return completions
+
+
+def _build_quiz_response(
+    current_user: User, quiz: QuizResponse | QuizAdminResponse, completions: list[dict]
+) -> QuizResponse | QuizAdminResponse:
+    # Cached quizes are shared between requests, only ever hand out updated copies
+    if current_user.role == UserRole.admin:
+        verified_completions = [VerifiedCompletion(**completion) for completion in completions]
+        return quiz.model_copy(update={"verified_completions": verified_completions})
+    else:
+        return quiz.model_copy(update={"verified_completion": bool(completions)})
 
 
 async def create_quiz(creation_request: QuizCreationRequest) -> Quiz:
     creation_request_dict = creation_request.model_dump(exclude_unset=True)
-    creation_request_dict["verified_completions"] = []
+    creation_request_dict["revision"] = 1
     insert_result = await mongo.quizes_collection.insert_one(creation_request_dict)
 
+    await invalidation.publish(QUIZES_TOPIC)
+
     creation_request_dict["_id"] = insert_result.inserted_id
     return Quiz(**creation_request_dict)
 
 
+async def import_quizes(chunks: AsyncIterator[bytes]) -> BulkImportResponse:
+    import_response = await import_ndjson(
+        chunks,
+        QuizCreationRequest,
+        lambda creation_request: {**creation_request.model_dump(exclude_unset=True), "revision": 1},
+        lambda quiz_dicts: mongo.quizes_collection.insert_many(quiz_dicts, ordered=False),
+    )
+
+    await invalidation.publish(QUIZES_TOPIC)
+
+    return import_response
+
+
+async def export_quizes() -> AsyncIterator[Quiz]:
+    cursor = mongo.quizes_collection.find({}, {"verified_completions": False}).sort("_id", 1)
+
+    async for quiz_dict in cursor:
+        yield Quiz(**quiz_dict)
+
+
 async def update_quiz_by_id(id: ObjectId, update: QuizUpdateRequest) -> Quiz:
     update_dict = update.model_dump(exclude_unset=True)
 
     updated_quiz_dict = await mongo.quizes_collection.find_one_and_update(
-        {"_id": id}, {"$set": update_dict}, return_document=ReturnDocument.AFTER
+        {"_id": id},
+        {"$set": update_dict, "$inc": {"revision": 1}},
+        projection={"verified_completions": False},
+        return_document=ReturnDocument.AFTER,
     )
 
+    await invalidation.publish(QUIZES_TOPIC)
+
     if updated_quiz_dict is None:
         raise QuizNotFound
 
@@ -67,52 +406,68 @@ async def update_quiz_by_id(id: ObjectId, update: QuizUpdateRequest) -> Quiz:
 
 async def delete_quiz_by_id(id: ObjectId):
     delete_result = await mongo.quizes_collection.delete_one({"_id": id})
+    await invalidation.publish(QUIZES_TOPIC)
 
     if delete_result.deleted_count == 0:
         raise QuizNotFound
 
+    await mongo.quiz_completions_collection.delete_many({"quiz_id": id})
 
-async def verify_quiz_completion(
-    quiz_id: ObjectId, user: User, verified_completion: VerifyCompletionRequest
-) -> VerifyCompletionResponse:
-    quiz_dict = await mongo.quizes_collection.find_one({"_id": quiz_id})
 
-    if not quiz_dict:
-        raise QuizNotFound
+async def find_answer_key(quiz_id: ObjectId) -> AnswerKey:
+    answer_key = _answer_keys_cache.get(quiz_id)
 
-    quiz = Quiz(**quiz_dict)
+    if answer_key is None:
+        generation = _answer_keys_cache.generation
+        quiz_dict = await mongo.quizes_collection.find_one(
+            {"_id": quiz_id},
+            {"_id": False, "questions.correct_answer_index": True, "points_per_answer": True},
+        )
 
-    if any(completion.user_id == user.id for completion in quiz.verified_completions):
-        raise QuizAlreadyCompleted
+        if not quiz_dict:
+            raise QuizNotFound
 
-    correct_answers = 0
-    for (
-        question_index,
-        provided_correct_answer_index,
-    ) in enumerate(verified_completion.correct_answer_indexes):
-        if provided_correct_answer_index == quiz.questions[question_index].correct_answer_index:
-            correct_answers += 1
+        answer_key = build_answer_key(quiz_dict)
+        _answer_keys_cache.set(quiz_id, answer_key, generation=generation)
 
-    earned_points = correct_answers * quiz.points_per_answer
+    return answer_key
 
-    update_result = await mongo.users_collection.update_one(
-        {"_id": user.id}, {"$inc": {"points": earned_points}}
-    )
 
-    if update_result.modified_count == 0:
-        raise UserNotFound
+async def verify_quiz_completion(
+    quiz_id: ObjectId, user: User, verified_completion: VerifyCompletionRequest
+) -> VerifyCompletionResponse:
+    answer_key = await find_answer_key(quiz_id)
+    quiz_grade = grade(answer_key, verified_completion.correct_answer_indexes)
+    earned_points = quiz_grade.earned_points
 
-    completion = VerifiedCompletion(
+    completion = QuizCompletion(
+        quiz_id=quiz_id,
         user_id=user.id,
-        correct_answers=correct_answers,
-        total_questions=len(quiz.questions),
+        correct_answers=quiz_grade.correct_answers,
+        total_questions=answer_key.total_questions,
         earned_points=earned_points,
         completed_timestamp=time.time(),
     )
     completion_dict = completion.model_dump()
 
-    await mongo.quizes_collection.update_one(
-        {"_id": quiz_id}, {"$push": {"verified_completions": completion_dict}}
+    # The unique (quiz_id, user_id) index makes concurrent duplicate submissions lose here
+    try:
+        await mongo.quiz_completions_collection.insert_one(completion_dict)
+    except DuplicateKeyError:
+        raise QuizAlreadyCompleted
+
+    update_result = await mongo.users_collection.update_one(
+        {"_id": user.id}, {"$inc": {"points": earned_points}}
     )
 
+    if update_result.matched_count == 0:
+        await mongo.quiz_completions_collection.delete_one({"_id": completion_dict["_id"]})
+        raise UserNotFound
+
+    # Admins see every completion and users their own, both views changed
+    # Cached views are left alone, the next conditional read finds their revision behind
+    # Mongo and reloads just that view, see evict_quizes_page
+    await mongo.quizes_collection.update_one({"_id": quiz_id}, {"$inc": {"revision": 1}})
+    leaderboard_service.invalidate_leaderboard_cache()
+
     return VerifyCompletionResponse(**completion_dict)
@@ -0,0 +1,59 @@
+import hashlib
+from typing import Any
+
+from bson import ObjectId
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+def _fallback(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """Encodes pydantic models straight to JSON bytes with pydantic-core.
+
+    Models are dumped by alias with their own serializers, so ObjectId fields go
+    through `mongo.ObjectIdAnnotation` exactly as in the default path. Returning it
+    from a handler skips FastAPI's validation of the return value against
+    `response_model`, only hand it models built by the services.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, by_alias=True, fallback=_fallback)
+
+
+def entity_tag(*parts: Any) -> str:
+    """Builds a weak ETag out of whatever identifies a representation."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def parse_etags(header: str | None) -> list[str]:
+    if not header:
+        return []
+
+    return [etag.strip().removeprefix("W/") for etag in header.split(",")]
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, as RFC 9110 asks for GET requests."""
+    etags = parse_etags(request.headers.get("if-none-match"))
+    return etag.removeprefix("W/") in etags or "*" in etags
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # Clients may keep the body but have to revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
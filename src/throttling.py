@@ -0,0 +1,169 @@
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from fastapi import Request
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from src import mongo
+from src.config import settings
+from src.exceptions import TooManyAttempts
+from src.monitoring import metrics
+
+
+class MemoryBucketStore:
+    """Token buckets of this process only, the least recently used keys are dropped first."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / refill_per_second
+
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return wait
+
+
+class MongoBucketStore:
+    """Token buckets shared by every worker, refilled and taken from in a single update.
+
+    The server clock is used throughout, so workers with skewed clocks agree.
+    """
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        elapsed_seconds = {
+            "$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]
+        }
+        refilled_tokens = {
+            "$min": [
+                capacity,
+                {
+                    "$add": [
+                        {"$ifNull": ["$tokens", capacity]},
+                        {"$multiply": [elapsed_seconds, refill_per_second]},
+                    ]
+                },
+            ]
+        }
+        # A bucket that had time to refill completely is the same as a missing one
+        full_after_ms = capacity / refill_per_second * 1000
+
+        bucket = await mongo.throttle_buckets_collection.find_one_and_update(
+            {"_id": key},
+            [
+                {
+                    "$set": {
+                        "tokens": refilled_tokens,
+                        "updated_at": "$$NOW",
+                        "expires_at": {"$add": ["$$NOW", full_after_ms]},
+                    }
+                },
+                {
+                    "$set": {
+                        "allowed": {"$gte": ["$tokens", 1]},
+                        "tokens": {
+                            "$cond": [
+                                {"$gte": ["$tokens", 1]},
+                                {"$subtract": ["$tokens", 1]},
+                                "$tokens",
+                            ]
+                        },
+                    }
+                },
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+        if bucket["allowed"]:
+            return 0.0
+
+        return (1 - bucket["tokens"]) / refill_per_second
+
+
+_store: MemoryBucketStore | MongoBucketStore | None = None
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global _store
+
+    if settings.throttle_store == "mongo":
+        _store = MongoBucketStore()
+    else:
+        _store = MemoryBucketStore(settings.throttle_max_keys)
+
+    yield
+
+    _store = None
+
+
+def client_address(request: Request) -> str:
+    # Behind a proxy this relies on uvicorn's --proxy-headers to see the real client
+    return request.client.host if request.client else "unknown"
+
+
+async def throttle_login(request: Request, email: str):
+    await _take_all(
+        (
+            "login:ip",
+            client_address(request),
+            settings.login_throttle_ip_burst,
+            settings.login_throttle_ip_per_minute,
+        ),
+        (
+            "login:email",
+            email.lower(),
+            settings.login_throttle_email_burst,
+            settings.login_throttle_email_per_minute,
+        ),
+    )
+
+
+async def throttle_sign_up(request: Request, email: str):
+    await _take_all(
+        (
+            "sign_up:ip",
+            client_address(request),
+            settings.sign_up_throttle_ip_burst,
+            settings.sign_up_throttle_ip_per_minute,
+        ),
+        (
+            "sign_up:email",
+            email.lower(),
+            settings.sign_up_throttle_email_burst,
+            settings.sign_up_throttle_email_per_minute,
+        ),
+    )
+
+
+async def _take_all(*buckets: tuple[str, str, int, float]):
+    if _store is None:
+        return
+
+    for scope, key, capacity, per_minute in buckets:
+        metrics.throttle_checks_total.labels(scope).inc()
+        wait = await _store.take(f"{scope}:{key}", capacity, per_minute / 60)
+
+        if wait > 0:
+            metrics.throttle_rejections_total.labels(scope).inc()
+            raise TooManyAttempts(wait)
+
+
+indexes = {
+    "throttle_buckets": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
@@ -1,3 +1,5 @@
+import hashlib
+import time
 from typing import Annotated
 
 from bson.objectid import ObjectId
@@ -5,6 +7,7 @@ from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
+from src.cache import TTLCache
 from src.users.schemas import UserRole
 
 from .exceptions import InvalidAccessToken
@@ -14,8 +17,18 @@ from src.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="tokens")
 
+_verified_tokens: TTLCache[bytes, TokenData] = TTLCache(
+    "tokens", lambda: settings.token_cache_max_entries, lambda: settings.token_cache_ttl
+)
+
 
 async def get_current_token(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    token_digest = hashlib.sha256(token.encode()).digest()
+
+    token_data = _verified_tokens.get(token_digest)
+    if token_data is not None:
+        return token_data
+
     try:
         payload = jwt.decode(
             token,
@@ -23,7 +36,7 @@ async def get_current_token(token: Annotated[str, Depends(oauth2_scheme)]) -> To
             algorithms=[settings.jwt_signing_algorithm],
         )
 
-        return TokenData(
+        token_data = TokenData(
             id=ObjectId(payload.get("id")),
             email=str(payload.get("email")),
             full_name=str(payload.get("full_name")),
@@ -31,3 +44,11 @@ async def get_current_token(token: Annotated[str, Depends(oauth2_scheme)]) -> To
         )
     except JWTError:
         raise InvalidAccessToken
+
+    # A token must not outlive its own expiry in the cache
+    expires_at = payload.get("exp")
+    ttl = float(expires_at) - time.time() if expires_at is not None else None
+
+    _verified_tokens.set(token_digest, token_data, ttl)
+
+    return token_data
@@ -14,7 +14,7 @@ def create_access_token(user: User) -> str:
     )
 
     return jwt.encode(
-        token_data.model_dump(),
+        token_data.model_dump(mode="json"),
         settings.jwt_signing_secret_key,
         algorithm=settings.jwt_signing_algorithm,
     )
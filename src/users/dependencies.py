@@ -1,9 +1,9 @@
 import logging
 from typing import Annotated
 
-from fastapi import Depends, Form
+from fastapi import Depends, Form, Request
 
-from src import mongo
+from src import mongo, throttling
 from src.users import service as users_service
 from src.tokens.dependencies import get_current_token
 from src.tokens.schemas import TokenData
@@ -12,24 +12,30 @@ from .schemas import PersistedUser, User, UserRole
 
 
 async def get_current_user_using_credentials(
-    email: Annotated[str, Form(alias="username")], password: Annotated[str, Form()]
+    request: Request,
+    email: Annotated[str, Form(alias="username")],
+    password: Annotated[str, Form()],
 ) -> User:
-    user_dict = await mongo.users_collection.find_one({"email": email})
+    # Throttled before the lookup, so floods cost neither a query nor a bcrypt round
+    await throttling.throttle_login(request, email)
+
+    user_dict = await mongo.users_collection.find_one(users_service.email_query(email))
 
     if not user_dict:
         raise IncorrectCredentials
 
     user = PersistedUser(**user_dict)
 
-    if not users_service.verify_password(password, user.hashed_password):
+    if not await users_service.verify_password(password, user.hashed_password):
         raise IncorrectCredentials
 
     return User(**user_dict)
 
 
 def get_current_user(token_data: Annotated[TokenData, Depends(get_current_token)]) -> User:
-    return User(
-        _id=token_data.id,
+    # The token data has already been validated, no need to do it again
+    return User.model_construct(
+        id=token_data.id,
         email=token_data.email,
         full_name=token_data.full_name,
         role=token_data.role,
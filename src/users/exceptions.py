@@ -27,3 +27,9 @@ class UserNotFound(DetailedHTTPException):
 class InsufficientUserRights(DetailedHTTPException):
     status_code = status.HTTP_403_FORBIDDEN
     detail = "This operation is forbidden for this resource"
+
+
+class PasswordHasherOverloaded(DetailedHTTPException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    detail = "Service is overloaded, please retry later"
+    headers = {"Retry-After": "1"}
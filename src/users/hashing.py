@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from typing import Callable, TypeVar
+
+from passlib.context import CryptContext
+
+from src.config import settings
+from src.monitoring import metrics
+from .exceptions import PasswordHasherOverloaded
+
+T = TypeVar("T")
+
+crypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor: Executor | None = None
+_slots: asyncio.Semaphore | None = None
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global _executor
+    global _slots
+
+    pool_kind = settings.password_hasher_pool
+    max_workers = settings.password_hasher_max_workers
+
+    if pool_kind == "process":
+        _executor = ProcessPoolExecutor(max_workers=max_workers)
+    elif pool_kind == "thread":
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+    else:
+        _executor = None
+
+    _slots = asyncio.Semaphore(max_workers + settings.password_hasher_max_queue)
+
+    yield
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+def _hash(password: str) -> str:
+    return crypt_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return crypt_context.verify(plain_password, hashed_password)
+
+
+async def _run(func: Callable[..., T], *args) -> T:
+    if _slots is None:
+        return func(*args)
+
+    # Reject instead of queueing without bound: a login burst must not pile up
+    # more bcrypt jobs than the pool can drain within the timeout.
+    if _slots.locked():
+        metrics.password_hashing_rejections_total.inc()
+        raise PasswordHasherOverloaded
+
+    if _executor is None:
+        async with _slots:
+            return func(*args)
+
+    await _slots.acquire()
+    job = _executor.submit(func, *args)
+    # The slot follows the job, not the request: a job whose caller timed out
+    # keeps its worker busy and must keep counting against the limit
+    job.add_done_callback(_release_slot(asyncio.get_running_loop(), _slots))
+
+    try:
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(job)), timeout=settings.password_hasher_timeout
+        )
+    except asyncio.TimeoutError:
+        # A job still queued for a worker is dropped, its caller already got a 503 and it
+        # must not burn CPU afterwards. A running job cannot be stopped and keeps its slot.
+        job.cancel()
+        metrics.password_hashing_rejections_total.inc()
+        raise PasswordHasherOverloaded
+
+
+def _release_slot(
+    loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore
+) -> Callable[[Future], None]:
+    def release(_: Future):
+        # Jobs finish on worker threads, the semaphore belongs to the event loop
+        with suppress(RuntimeError):
+            loop.call_soon_threadsafe(slots.release)
+
+    return release
+
+
+async def hash_password(password: str) -> str:
+    with metrics.password_hashing_duration_seconds.labels("hash").time():
+        return await _run(_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    with metrics.password_hashing_duration_seconds.labels("verify").time():
+        return await _run(_verify, plain_password, hashed_password)
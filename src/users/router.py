@@ -1,10 +1,18 @@
 from typing import Annotated
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, Form
+from fastapi import APIRouter, Depends, Form, Request, Response
 from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_202_ACCEPTED, HTTP_204_NO_CONTENT
 
+from src import throttling
 from src.mongo import path_param_object_id
+from src.pagination import (
+    ListFormat,
+    Page,
+    ndjson_response,
+    query_param_page,
+    set_next_page_header,
+)
 from src.users import service as users_service
 from src.users.dependencies import get_current_user, get_required_admin_user
 from src.users.schemas import User, UserDetails, UserUpdateRequest
@@ -13,7 +21,8 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.post("/creation-requests", status_code=HTTP_202_ACCEPTED)
-async def request_user_creation(details: UserDetails):
+async def request_user_creation(request: Request, details: UserDetails):
+    await throttling.throttle_sign_up(request, details.email)
     await users_service.request_user_creation(details)
 
 
@@ -27,9 +36,24 @@ async def current_user(current_user: Annotated[User, Depends(get_current_user)])
     return current_user
 
 
-@router.get("/", status_code=HTTP_200_OK, dependencies=[Depends(get_required_admin_user)])
-async def find_all_users() -> list[User]:
-    return await users_service.find_all_users()
+@router.get(
+    "/",
+    status_code=HTTP_200_OK,
+    response_model=list[User],
+    dependencies=[Depends(get_required_admin_user)],
+)
+async def find_all_users(
+    page: Annotated[Page, Depends(query_param_page)],
+    response: Response,
+    format: ListFormat = ListFormat.json,
+):
+    if format == ListFormat.ndjson:
+        return ndjson_response(users_service.iterate_users(page))
+
+    users = await users_service.find_all_users(page)
+    set_next_page_header(response, page, users)
+
+    return users
 
 
 @router.get("/{id}", status_code=HTTP_200_OK, dependencies=[Depends(get_required_admin_user)])
@@ -1,6 +1,7 @@
 from enum import Enum
 
 from pydantic import BaseModel, EmailStr, Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
 
 from src.mongo import ModelObjectId
 
@@ -50,3 +51,14 @@ class UserUpdateRequest(BaseModel):
 class EmailValidationTemplateBody(BaseModel):
     full_name: str
     validation_token: str
+
+
+indexes = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("points", DESCENDING), ("_id", ASCENDING)]),
+    ],
+    "user_creation_requests": [
+        IndexModel([("validation_token", ASCENDING)], unique=True),
+    ],
+}
@@ -1,12 +1,17 @@
 import secrets
 import string
 
+from typing import AsyncIterator
+
 from bson import ObjectId
 from fastapi_mail import MessageSchema, MessageType
-from passlib.context import CryptContext
 from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
-from src import mongo, mail
+from src import invalidation, mongo
+from src.mail import outbox
+from src.pagination import Page
+from src.users import hashing
 from .exceptions import EmailAlreadyExists, InvalidOrExpiredValidationToken, UserNotFound
 from .schemas import (
     User,
@@ -19,21 +24,35 @@ from .schemas import (
     UserUpdateRequest,
 )
 
-crypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+USERS_TOPIC = "users"
+
+
+def email_query(email: str) -> dict:
+    # Served by the unique email index
+    return {"email": email}
+
+
+def validation_token_query(validation_token: str) -> dict:
+    return {"validation_token": validation_token}
 
 
 async def find_user_by_email(email: str) -> UserResponse | None:
-    user_dict = await mongo.users_collection.find_one({"email": email})
+    user_dict = await mongo.users_collection.find_one(email_query(email))
     if user_dict:
         return UserResponse(**user_dict)
     else:
         return None
 
 
-async def find_all_users() -> list[UserResponse]:
-    user_dicts = await mongo.users_collection.find({}).to_list(None)
+async def iterate_users(page: Page = Page()) -> AsyncIterator[UserResponse]:
+    cursor = mongo.users_collection.find(page.filter(), {"hashed_password": False})
 
-    return list(map(lambda dict: UserResponse(**dict), user_dicts))
+    async for user_dict in page.apply(cursor):
+        yield UserResponse(**user_dict)
+
+
+async def find_all_users(page: Page = Page()) -> list[UserResponse]:
+    return [user async for user in iterate_users(page)]
 
 
 async def find_user_by_id(id: ObjectId) -> UserResponse:
@@ -45,10 +64,19 @@ async def find_user_by_id(id: ObjectId) -> UserResponse:
         raise UserNotFound
 
 
+async def find_user_points(id: ObjectId) -> int:
+    user_dict = await mongo.users_collection.find_one({"_id": id}, {"points": True})
+
+    if user_dict:
+        return user_dict.get("points", 0)
+    else:
+        raise UserNotFound
+
+
 async def update_user_by_id(id: ObjectId, update: UserUpdateRequest) -> UserResponse:
     update_dict = update.model_dump(exclude_unset=True)
     if "password" in update_dict:
-        update_dict["hashed_password"] = crypt_context.hash(update_dict.pop("password"))
+        update_dict["hashed_password"] = await hash_password(update_dict.pop("password"))
 
     updated_user_dict = await mongo.users_collection.find_one_and_update(
         {"_id": id}, {"$set": update_dict}, return_document=ReturnDocument.AFTER
@@ -57,6 +85,8 @@ async def update_user_by_id(id: ObjectId, update: UserUpdateRequest) -> UserResp
     if updated_user_dict is None:
         raise UserNotFound
 
+    await invalidation.publish(USERS_TOPIC)
+
     return UserResponse(**updated_user_dict)
 
 
@@ -66,6 +96,8 @@ async def delete_user_by_id(id: ObjectId):
     if delete_result.deleted_count == 0:
         raise UserNotFound
 
+    await invalidation.publish(USERS_TOPIC)
+
 
 async def request_user_creation(details: UserDetails):
     user = await find_user_by_email(details.email)
@@ -84,21 +116,21 @@ async def request_user_creation(details: UserDetails):
         ).model_dump(),
     )
 
-    await mail.client.send_message(email_message_schema, template_name="email_validation.html")
-
     user_creation_request = UserCreationRequest(
         email=details.email,
         full_name=details.full_name,
         validation_token=validation_token,
-        hashed_password=crypt_context.hash(details.password),
+        hashed_password=await hash_password(details.password),
     )
 
     await mongo.user_creation_requests_collection.insert_one(user_creation_request.model_dump())
 
+    await outbox.enqueue_message(email_message_schema, template_name="email_validation.html")
+
 
 async def proceed_user_creation(validation_token: str) -> User:
     creation_request_dict = await mongo.user_creation_requests_collection.find_one(
-        {"validation_token": validation_token}
+        validation_token_query(validation_token)
     )
 
     if not creation_request_dict:
@@ -107,7 +139,9 @@ async def proceed_user_creation(validation_token: str) -> User:
     user_creation_request = UserCreationRequest(**creation_request_dict)
     user = await create_user_using_request(user_creation_request, role=UserRole.user)
 
-    await mongo.user_creation_requests_collection.delete_one({"validation_token": validation_token})
+    await mongo.user_creation_requests_collection.delete_one(
+        validation_token_query(validation_token)
+    )
 
     return user
 
@@ -121,13 +155,40 @@ async def create_user_using_details(details: UserDetails, role: UserRole = UserR
         email=details.email,
         full_name=details.full_name,
         role=role,
-        hashed_password=crypt_context.hash(details.password),
+        hashed_password=await hash_password(details.password),
     )
-    await mongo.users_collection.insert_one(user.model_dump())
+    await _insert_user(user)
 
     return user
 
 
+async def ensure_user_using_details(details: UserDetails, role: UserRole = UserRole.user) -> bool:
+    """Creates the user unless the email is taken, returns whether it was created.
+
+    Safe to run concurrently, the password is only hashed when the user is missing.
+    """
+    if await mongo.users_collection.find_one(email_query(details.email), {"_id": True}):
+        return False
+
+    user = PersistedUser(
+        _id=ObjectId(),
+        email=details.email,
+        full_name=details.full_name,
+        role=role,
+        hashed_password=await hash_password(details.password),
+    )
+    user_dict = user.model_dump(by_alias=True, exclude={"email"})
+
+    try:
+        update_result = await mongo.users_collection.update_one(
+            email_query(details.email), {"$setOnInsert": user_dict}, upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+
+    return update_result.upserted_id is not None
+
+
 async def create_user_using_request(
     request: UserCreationRequest, role: UserRole = UserRole.user
 ) -> User:
@@ -138,13 +199,27 @@ async def create_user_using_request(
         role=role,
         hashed_password=request.hashed_password,
     )
-    await mongo.users_collection.insert_one(user.model_dump())
+    await _insert_user(user)
 
     return user
 
 
-def verify_password(plain_password, hashed_password) -> bool:
-    return crypt_context.verify(plain_password, hashed_password)
+async def _insert_user(user: PersistedUser):
+    # The unique email index settles races between concurrent sign-ups
+    try:
+        await mongo.users_collection.insert_one(user.model_dump(by_alias=True))
+    except DuplicateKeyError:
+        raise EmailAlreadyExists
+
+    await invalidation.publish(USERS_TOPIC)
+
+
+async def hash_password(password: str) -> str:
+    return await hashing.hash_password(password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hashing.verify_password(plain_password, hashed_password)
 
 
 def generate_email_validation_token() -> str: